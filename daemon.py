@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻扫描守护进程
+进程常驻, 只在启动时探测一次Nmap; 通过本地 HTTP/JSON 接口接收扫描任务, 所有任务
+共享一个固定大小的Nmap进程池, 按任务轮转(round-robin)取目标, 保证多个任务公平推进
+
+接口:
+  POST   /jobs                 提交任务 {"targets": [...], "ports": "80,443", "scan_type": "quick",
+                               "service_detect": true, "os_detect": false,
+                               "script_scan": false, "aggressive": false}
+  GET    /jobs                 任务列表
+  GET    /jobs/<id>            任务状态与进度
+  GET    /jobs/<id>/results    结果流(JSON Lines, 默认持续推送到任务结束; ?follow=0 只取当前快照)
+  GET    /jobs/<id>/report     下载HTML报告(任务结束后)
+  DELETE /jobs/<id>            取消任务(丢弃未开始的目标)
+  GET    /health               引擎与进程池状态
+
+鉴权: 设置口令后每个请求需带 `Authorization: Bearer <口令>`, 否则返回401;
+      默认只监听本机, 监听其他地址时必须设置口令(与分布式协调者相同)
+
+Author: Security Researcher
+License: MIT
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlparse, parse_qs
+
+from distributed import check_token, is_loopback
+from result_model import to_plain
+from target_source import is_valid_target
+
+SCAN_TYPES = ('default', 'quick', 'full', 'stealth')
+_PORTS_PATTERN = re.compile(r'^[0-9TU:,\-]+$')
+
+
+class JobError(ValueError):
+    """任务参数错误"""
+
+
+class ScanJob:
+    """单个扫描任务"""
+
+    def __init__(self, job_id, targets, scanner):
+        self.id = job_id
+        self.targets = list(targets)
+        self.pending = deque(self.targets)
+        self.scanner = scanner
+        self.status = 'queued'
+        self.running = 0
+        self.done = 0
+        self.records = []           # [(ip, host_data)] 按完成顺序, 供结果流使用
+        self.created = datetime.now()
+        self.finished = None
+        self.report_file = None
+        self.cond = threading.Condition()
+
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'cancelled')
+
+    def summary(self):
+        with self.cond:
+            return {
+                'id': self.id,
+                'status': self.status,
+                'targets': len(self.targets),
+                'scanned': self.done,
+                'running': self.running,
+                'pending': len(self.pending),
+                'alive_hosts': self.scanner.alive_hosts,
+                'open_ports': self.scanner.total_ports,
+                'created': self.created.isoformat(timespec='seconds'),
+                'finished': self.finished.isoformat(timespec='seconds') if self.finished else None,
+            }
+
+
+class ScanDaemon:
+    """常驻扫描引擎: 共享Nmap进程池 + 任务公平调度"""
+
+    def __init__(self, scanner_factory, max_processes=4, work_dir=None, max_finished_jobs=100):
+        """
+        :param scanner_factory: 创建任务扫描器的函数 scanner_factory(**options) -> NmapScanner,
+                                未传入的选项使用默认值
+        :param max_processes: 同时运行的Nmap进程数上限(所有任务共享)
+        :param work_dir: 报告存放目录(默认临时目录)
+        :param max_finished_jobs: 保留的已结束任务数, 超出后淘汰最早的
+        """
+        self.scanner_factory = scanner_factory
+        self.max_processes = max_processes
+        self.work_dir = work_dir or tempfile.mkdtemp(prefix='nmap-scanner-')
+        self.max_finished_jobs = max_finished_jobs
+        self.jobs = OrderedDict()
+        self._runnable = deque()    # 仍有待扫描目标的任务(轮转队列)
+        self._cond = threading.Condition()
+        self._stopping = False
+
+        # 引擎常驻: 启动时探测一次Nmap, 之后所有任务复用
+        self.engine = scanner_factory()
+        self.engine.check_nmap()
+
+        self._workers = [threading.Thread(target=self._worker_loop, daemon=True,
+                                          name=f"nmap-pool-{i}")
+                         for i in range(max_processes)]
+        for thread in self._workers:
+            thread.start()
+
+    # ---------- 任务管理 ----------
+
+    def submit(self, spec):
+        """
+        提交任务
+        :param spec: 任务参数字典(见模块说明)
+        :return: ScanJob
+        :raises JobError: 参数不合法
+        """
+        targets = spec.get('targets')
+        if isinstance(targets, str):
+            targets = targets.split()
+        if not targets or not all(isinstance(t, str) and t.strip() for t in targets):
+            raise JobError('targets must be a non-empty list of strings')
+        targets = [t.strip() for t in targets]
+        # 校验格式, 同时防止通过目标注入Nmap参数
+        invalid = [t for t in targets if not is_valid_target(t)]
+        if invalid:
+            raise JobError(f"invalid target: {invalid[0]}")
+
+        ports = spec.get('ports')
+        if ports is not None and (not isinstance(ports, str) or not _PORTS_PATTERN.match(ports)):
+            raise JobError('invalid ports')
+        scan_type = spec.get('scan_type', 'default')
+        if scan_type not in SCAN_TYPES:
+            raise JobError(f"scan_type must be one of {', '.join(SCAN_TYPES)}")
+
+        # 未指定的选项沿用守护进程启动时的命令行参数
+        options = {key: bool(spec[key]) for key in
+                   ('service_detect', 'os_detect', 'script_scan', 'aggressive') if key in spec}
+        if ports is not None:
+            options['ports'] = ports
+        if 'scan_type' in spec:
+            options['scan_type'] = scan_type
+        scanner = self.scanner_factory(**options)
+        # 复用引擎的Nmap探测结果
+        scanner.nmap_caps = self.engine.nmap_caps
+        scanner.nmap_path = self.engine.nmap_path
+        scanner.nmap_version = self.engine.nmap_version
+        # 进程池中多个Nmap同时运行, 不逐行转发Nmap输出, 避免交错
+        scanner.concurrent = True
+
+        job = ScanJob(uuid.uuid4().hex[:12], targets, scanner)
+        scanner.output_file = os.path.join(self.work_dir, f"{job.id}.html")
+        with self._cond:
+            self.jobs[job.id] = job
+            self._runnable.append(job)
+            self._evict_finished()
+            self._cond.notify_all()
+        print(f"[*] 新任务 {job.id}: {len(targets)} 个目标")
+        return job
+
+    def cancel(self, job):
+        with self._cond:
+            if job in self._runnable:
+                self._runnable.remove(job)
+        with job.cond:
+            job.pending.clear()
+            if job.running == 0 and not job.is_finished:
+                self._finish(job, 'cancelled')
+            elif not job.is_finished:
+                job.status = 'cancelling'
+
+    def _evict_finished(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.is_finished]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            job = self.jobs.pop(job_id)
+            if job.report_file and os.path.exists(job.report_file):
+                os.unlink(job.report_file)
+
+    # ---------- 进程池 ----------
+
+    def _next_task(self):
+        """轮转取下一个目标: 每个任务每轮最多取一个, 大任务不会饿死小任务"""
+        with self._cond:
+            while True:
+                if self._stopping:
+                    return None, None
+                while self._runnable:
+                    job = self._runnable.popleft()
+                    with job.cond:
+                        if not job.pending:
+                            continue
+                        target = job.pending.popleft()
+                        job.running += 1
+                        if job.status == 'queued':
+                            job.status = 'running'
+                            job.scanner.start_time = datetime.now()
+                        if job.pending:
+                            self._runnable.append(job)
+                    return job, target
+                self._cond.wait()
+
+    def _worker_loop(self):
+        while True:
+            job, target = self._next_task()
+            if job is None:
+                return
+            try:
+                results = job.scanner.scan_target(target)
+                if results is not None:
+                    with job.cond:
+                        job.scanner.handle_results(target, results)
+                        job.scanner.total_scanned += 1
+                        job.records.extend(results.items())
+            except Exception as e:
+                # 单个目标出错不能终止进程池线程
+                print(f"[!] 任务 {job.id} 扫描 {target} 出错: {e}")
+            finally:
+                # 无论成败都更新计数, 否则任务永远不会结束
+                with job.cond:
+                    job.running -= 1
+                    job.done += 1
+                    if not job.pending and job.running == 0:
+                        self._finish(job, 'cancelled' if job.status == 'cancelling' else 'done')
+                    job.cond.notify_all()
+
+    def _finish(self, job, status):
+        """任务结束(调用方持有 job.cond)"""
+        job.status = status
+        job.finished = datetime.now()
+        job.scanner.end_time = job.finished
+        if job.scanner.start_time is None:
+            job.scanner.start_time = job.finished
+        job.cond.notify_all()
+        print(f"[+] 任务 {job.id} {status}: {job.scanner.alive_hosts} 个存活主机")
+
+    def report(self, job):
+        """生成(或复用)任务HTML报告, 返回文件路径"""
+        with job.cond:
+            if job.report_file is None:
+                job.scanner.generate_html_report()
+                job.report_file = job.scanner.output_file
+            return job.report_file
+
+    def health(self):
+        with self._cond:
+            active = [job for job in self.jobs.values() if not job.is_finished]
+            return {
+                'nmap_version': self.engine.nmap_version,
+                'nmap_path': self.engine.nmap_path,
+                'max_processes': self.max_processes,
+                'running_processes': sum(job.running for job in active),
+                'active_jobs': len(active),
+                'queued_targets': sum(len(job.pending) for job in active),
+            }
+
+    # ---------- HTTP ----------
+
+    def serve_forever(self, address=('127.0.0.1', 8765), token=None):
+        """
+        启动HTTP接口并阻塞运行
+        :param address: 监听地址 (HOST, PORT)
+        :param token: 接口口令(只监听本机时可省略)
+        :raises ValueError: 监听非本机地址却未设置口令
+        """
+        if not token and not is_loopback(address[0]):
+            raise ValueError(f"守护进程监听非本机地址 {address[0]} 时必须设置 --token")
+        server = _DaemonHTTPServer(address, _DaemonRequestHandler)
+        server.scan_daemon = self
+        server.token = token
+        host, port = server.server_address[:2]
+        print(f"[*] 扫描守护进程已启动: http://{host}:{port}  (进程池: {self.max_processes})")
+        print(f"[*] 报告目录: {self.work_dir}")
+        try:
+            server.serve_forever()
+        finally:
+            with self._cond:
+                self._stopping = True
+                self._cond.notify_all()
+            server.server_close()
+
+
+class _DaemonHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _DaemonRequestHandler(BaseHTTPRequestHandler):
+    """HTTP/JSON 请求处理"""
+
+    server_version = 'NmapScannerDaemon'
+    # 结果流使用 chunked 编码, 需要 HTTP/1.1; 其他响应都带 Content-Length, 支持连接复用
+    protocol_version = 'HTTP/1.1'
+    # 空闲的复用连接超时关闭
+    timeout = 60
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        """
+        读取完整请求体; 任何响应(包括提前返回的错误)之前都要读完,
+        否则复用连接上残留的请求体会被当作下一个请求解析
+        :return: 请求体, Content-Length 无效时返回None(并在响应后关闭连接)
+        """
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            return None
+        return self.rfile.read(length) if length else b''
+
+    def _authorized(self):
+        """校验口令; 未通过时已发送401"""
+        token = self.server.token
+        if not token:
+            return True
+        scheme, _, given = (self.headers.get('Authorization') or '').partition(' ')
+        if scheme.lower() == 'bearer' and check_token(token, given.strip()):
+            return True
+        self._json(401, {'error': 'unauthorized'})
+        return False
+
+    def _route(self):
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split('/') if p]
+        return parts, parse_qs(url.query)
+
+    def _job(self, job_id):
+        job = self.server.scan_daemon.jobs.get(job_id)
+        if job is None:
+            self._json(404, {'error': 'job not found'})
+        return job
+
+    def do_GET(self):
+        if self._read_body() is None:
+            return self._json(400, {'error': 'invalid Content-Length'})
+        if not self._authorized():
+            return
+        daemon = self.server.scan_daemon
+        parts, query = self._route()
+        if parts == ['health']:
+            return self._json(200, daemon.health())
+        if parts == ['jobs']:
+            return self._json(200, [job.summary() for job in list(daemon.jobs.values())])
+        if len(parts) >= 2 and parts[0] == 'jobs':
+            job = self._job(parts[1])
+            if job is None:
+                return
+            if len(parts) == 2:
+                return self._json(200, job.summary())
+            if parts[2] == 'results':
+                follow = query.get('follow', ['1'])[0] not in ('0', 'false')
+                return self._stream_results(job, follow)
+            if parts[2] == 'report':
+                return self._send_report(job)
+        self._json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        body = self._read_body()
+        if body is None:
+            return self._json(400, {'error': 'invalid Content-Length'})
+        if not self._authorized():
+            return
+        parts, _ = self._route()
+        if parts != ['jobs']:
+            return self._json(404, {'error': 'not found'})
+        try:
+            spec = json.loads(body.decode('utf-8') or '{}')
+            if not isinstance(spec, dict):
+                raise JobError('request body must be a JSON object')
+            job = self.server.scan_daemon.submit(spec)
+        except (ValueError, JobError) as e:
+            return self._json(400, {'error': str(e)})
+        self._json(201, job.summary())
+
+    def do_DELETE(self):
+        if self._read_body() is None:
+            return self._json(400, {'error': 'invalid Content-Length'})
+        if not self._authorized():
+            return
+        parts, _ = self._route()
+        if len(parts) == 2 and parts[0] == 'jobs':
+            job = self._job(parts[1])
+            if job is not None:
+                self.server.scan_daemon.cancel(job)
+                self._json(200, job.summary())
+            return
+        self._json(404, {'error': 'not found'})
+
+    def _stream_results(self, job, follow):
+        """
+        以 chunked 方式推送 JSON Lines, 每个主机一行
+        HTTP/1.0 客户端不支持 chunked, 直接写出内容并在结束后关闭连接
+        """
+        chunked = self.request_version != 'HTTP/1.0'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson; charset=utf-8')
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            self.send_header('Connection', 'close')
+            self.close_connection = True
+        self.end_headers()
+        sent = 0
+        try:
+            while True:
+                with job.cond:
+                    while follow and sent >= len(job.records) and not job.is_finished:
+                        job.cond.wait(15)
+                    batch = job.records[sent:]
+                    finished = job.is_finished
+                sent += len(batch)
+                if batch:
+                    data = ''.join(json.dumps(dict(ip=ip, **to_plain(host)), ensure_ascii=False) + '\n'
+                                   for ip, host in batch).encode('utf-8')
+                    self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b'\r\n'
+                                     if chunked else data)
+                    self.wfile.flush()
+                if not follow or (finished and sent >= len(job.records)):
+                    break
+            if chunked:
+                self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def _send_report(self, job):
+        if not job.is_finished:
+            return self._json(409, {'error': 'job not finished', 'status': job.status})
+        path = self.server.scan_daemon.report(job)
+        with open(path, 'rb') as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Content-Disposition', f'attachment; filename="scan_{job.id}.html"')
+        self.end_headers()
+        self.wfile.write(body)
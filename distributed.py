@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分布式扫描: 协调者(coordinator) / 工作节点(worker)
+协调者把目标列表切分为若干分片, 工作节点通过TCP连接主动拉取分片、在本机调用
+Nmap扫描并回传解析后的结果, 由协调者汇总生成统一报告
+
+协议: 每行一个JSON消息
+  worker -> coordinator  {"type": "hello", "worker": 名称, "token": 口令, "nmap_version": ...}
+                         {"type": "get"}
+                         {"type": "result", "shard": 分片号, "results": {...}, "scanned": 目标数}
+  coordinator -> worker  {"type": "welcome"} / {"type": "error", "message": ...}
+                         {"type": "shard", "shard": 分片号, "targets": [...]}
+                         {"type": "wait", "seconds": 秒} / {"type": "done"} / {"type": "ack"}
+
+调度: 工作节点空闲时才拉取(pull), 快的节点自然多干; 待分配队列为空时, 空闲节点会
+"窃取"运行时间最长的在途分片重复执行, 先完成者生效, 避免被慢节点拖住
+容错: 节点断开后, 其在途分片(没有其他节点在执行时)重新入队, 超过重试次数记为失败
+结束: 全部分片完成后协调者继续向已连接的节点回复 done, 等待它们断开(最多 DONE_GRACE 秒)后退出;
+      此后仍在重复执行被窃取分片的节点读到连接关闭, 视为正常结束
+安全: 协调者默认只监听本机; 监听其他地址时必须设置口令, 否则任何能连接的主机都可领取目标、伪造结果
+
+Author: Security Researcher
+License: MIT
+"""
+
+import hmac
+import ipaddress
+import json
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+
+from result_model import HostRecord
+
+DONE_GRACE = 5   # 扫描完成后等待工作节点断开的最长秒数
+
+
+def _send(wfile, message):
+    wfile.write(json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n')
+    wfile.flush()
+
+
+def _recv(rfile):
+    line = rfile.readline()
+    if not line:
+        raise ConnectionError('connection closed')
+    return json.loads(line.decode('utf-8'))
+
+
+def parse_address(address, default_host='127.0.0.1'):
+    """解析 HOST:PORT 或 PORT"""
+    host, _, port = str(address).rpartition(':')
+    return host or default_host, int(port)
+
+
+def is_loopback(host):
+    """监听地址是否只接受本机连接"""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def check_token(expected, given):
+    """常数时间比较连接口令"""
+    return hmac.compare_digest((expected or '').encode('utf-8'), str(given or '').encode('utf-8'))
+
+
+class Shard:
+    """目标分片"""
+
+    __slots__ = ('id', 'targets', 'failures', 'owners', 'started')
+
+    def __init__(self, shard_id, targets):
+        self.id = shard_id
+        self.targets = targets
+        self.failures = 0
+        self.owners = set()
+        self.started = None
+
+
+class _WorkerHandler(socketserver.StreamRequestHandler):
+    """单个工作节点连接"""
+
+    def handle(self):
+        coordinator = self.server.coordinator
+        worker = f"{self.client_address[0]}:{self.client_address[1]}"
+        try:
+            hello = _recv(self.rfile)
+            if hello.get('type') != 'hello' or not check_token(coordinator.token, hello.get('token')):
+                _send(self.wfile, {'type': 'error', 'message': 'authentication failed'})
+                return
+            worker = hello.get('worker') or worker
+            coordinator.register_worker(worker, hello)
+            _send(self.wfile, {'type': 'welcome'})
+
+            while True:
+                message = _recv(self.rfile)
+                if message.get('type') == 'get':
+                    _send(self.wfile, coordinator.next_assignment(worker))
+                elif message.get('type') == 'result':
+                    coordinator.complete(worker, message['shard'],
+                                         message.get('results') or {},
+                                         message.get('scanned', 0))
+                    _send(self.wfile, {'type': 'ack'})
+                else:
+                    _send(self.wfile, {'type': 'error', 'message': 'unknown message'})
+        except (ConnectionError, OSError, ValueError, KeyError):
+            pass
+        finally:
+            coordinator.release_worker(worker)
+
+
+class _ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class Coordinator:
+    """分布式扫描协调者"""
+
+    def __init__(self, targets, address='127.0.0.1:9700', shard_size=1, max_retries=3,
+                 token=None, on_results=None):
+        """
+        :param targets: 目标列表(通常来自 NmapScanner.load_targets())
+        :param address: 监听地址 HOST:PORT (端口为0时自动分配)
+        :param shard_size: 每个分片包含的目标数
+        :param max_retries: 分片因节点断开而重试的最大次数
+        :param token: 工作节点连接口令(只监听本机时可省略)
+        :param on_results: 回调 on_results(分片目标列表, 结果字典, 已扫描目标数)
+        :raises ValueError: 监听非本机地址却未设置口令
+        """
+        self.address = parse_address(address)
+        if not token and not is_loopback(self.address[0]):
+            raise ValueError(f"协调者监听非本机地址 {self.address[0]} 时必须设置 --token")
+        self.token = token
+        self.max_retries = max_retries
+        self.on_results = on_results
+
+        targets = list(targets)
+        self.shards = {}
+        for start in range(0, len(targets), shard_size):
+            shard = Shard(len(self.shards), targets[start:start + shard_size])
+            self.shards[shard.id] = shard
+        self.pending = deque(self.shards.values())
+        self.completed = set()
+        self.failed = []
+        self.workers = {}
+        self.nmap_versions = set()               # 曾连接的工作节点的Nmap版本
+        self._cond = threading.Condition()
+        self._delivering = 0                     # 已采纳、回调尚未返回的分片数
+        self._callback_lock = threading.Lock()   # 回调串行执行, 但不占用调度锁
+        self._server = None
+
+    @property
+    def finished(self):
+        return len(self.completed) + len(self.failed) >= len(self.shards)
+
+    def start(self):
+        """启动监听(后台线程), 返回实际监听地址"""
+        self._server = _ThreadingTCPServer(self.address, _WorkerHandler)
+        self._server.coordinator = self
+        self.address = self._server.server_address[:2]
+        thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        thread.start()
+        print(f"[*] 协调者已监听 {self.address[0]}:{self.address[1]}, "
+              f"共 {len(self.shards)} 个分片")
+        return self.address
+
+    def wait(self, timeout=None):
+        """等待全部分片完成或失败"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self.finished or self._delivering:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._cond.wait(remaining if remaining is not None else 1)
+        return self.finished and not self._delivering
+
+    def wait_workers(self, timeout=DONE_GRACE):
+        """扫描完成后等待已连接的工作节点领取结束通知并断开(最多 timeout 秒)"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self.workers:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+        return not self.workers
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def run(self):
+        """启动并阻塞直到扫描完成"""
+        self.start()
+        try:
+            self.wait()
+            self.wait_workers()
+        finally:
+            self.stop()
+        if self.failed:
+            print(f"[!] {len(self.failed)} 个分片多次失败, 已放弃: "
+                  f"{', '.join(t for shard in self.failed for t in shard.targets)}")
+
+    def register_worker(self, worker, hello):
+        with self._cond:
+            self.workers[worker] = hello
+            if hello.get('nmap_version'):
+                self.nmap_versions.add(hello['nmap_version'])
+        print(f"[+] 工作节点已连接: {worker} ({hello.get('nmap_version') or 'unknown'})")
+
+    def next_assignment(self, worker):
+        """为工作节点分配分片(队列为空时窃取在途分片)"""
+        with self._cond:
+            if self.finished:
+                return {'type': 'done'}
+
+            shard = None
+            while self.pending:
+                candidate = self.pending.popleft()
+                if candidate.id not in self.completed:
+                    shard = candidate
+                    break
+
+            if shard is None:
+                # 窃取: 选择只有一个执行者、运行时间最长且不属于本节点的在途分片
+                in_flight = [s for s in self.shards.values()
+                             if s.id not in self.completed and len(s.owners) == 1
+                             and worker not in s.owners]
+                if not in_flight:
+                    return {'type': 'wait', 'seconds': 1}
+                shard = min(in_flight, key=lambda s: s.started)
+                print(f"[*] {worker} 窃取分片 #{shard.id} ({', '.join(shard.targets)})")
+
+            shard.owners.add(worker)
+            if shard.started is None or len(shard.owners) == 1:
+                shard.started = time.monotonic()
+            return {'type': 'shard', 'shard': shard.id, 'targets': shard.targets}
+
+    def complete(self, worker, shard_id, results, scanned):
+        """
+        工作节点回传分片结果(重复执行的分片只采纳第一个结果)
+        回调在释放调度锁之后执行: 回调可能阻塞(如结果输出队列已满), 不能卡住其他节点的领取与断开处理
+        """
+        with self._cond:
+            shard = self.shards.get(shard_id)
+            if shard is None:
+                return
+            shard.owners.discard(worker)
+            if shard_id in self.completed:
+                return
+            self.completed.add(shard_id)
+            self._delivering += 1
+            progress = len(self.completed)
+        try:
+            parsed = {ip: HostRecord.from_dict(data) for ip, data in results.items()}
+            if self.on_results is not None:
+                with self._callback_lock:
+                    self.on_results(shard.targets, parsed, scanned)
+            print(f"[+] 分片 #{shard_id} 完成 ({worker}), 进度 {progress}/{len(self.shards)}")
+        finally:
+            with self._cond:
+                self._delivering -= 1
+                self._cond.notify_all()
+
+    def release_worker(self, worker):
+        """工作节点断开: 重新分配其未完成的分片"""
+        with self._cond:
+            self.workers.pop(worker, None)
+            for shard in self.shards.values():
+                if worker not in shard.owners:
+                    continue
+                shard.owners.discard(worker)
+                if shard.id in self.completed or shard.owners:
+                    continue
+                shard.failures += 1
+                shard.started = None
+                if shard.failures > self.max_retries:
+                    self.failed.append(shard)
+                    print(f"[!] 分片 #{shard.id} 重试 {self.max_retries} 次后仍失败")
+                else:
+                    self.pending.appendleft(shard)
+                    print(f"[!] 工作节点 {worker} 断开, 分片 #{shard.id} 重新入队")
+            self._cond.notify_all()
+
+
+def run_worker(address, scan_func, name=None, token=None, nmap_version=None,
+               connect_timeout=30):
+    """
+    运行工作节点: 循环拉取分片 -> 扫描 -> 回传结果, 直到协调者通知结束或关闭连接
+    :param address: 协调者地址 HOST:PORT
+    :param scan_func: 扫描函数 scan_func(target) -> 结果字典(扫描失败返回None)
+    :param name: 节点名称(默认 主机名-进程号)
+    :param token: 连接口令
+    :param nmap_version: 本机Nmap版本(报告中展示)
+    :param connect_timeout: 等待协调者启动的最长秒数
+    :return: 本节点完成的分片数
+    """
+    import os
+
+    host, port = parse_address(address, default_host='127.0.0.1')
+    name = name or f"{socket.gethostname()}-{os.getpid()}"
+
+    deadline = time.monotonic() + connect_timeout
+    while True:
+        try:
+            sock = socket.create_connection((host, port))
+            break
+        except OSError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.5)
+
+    completed = 0
+    with sock, sock.makefile('rb') as rfile, sock.makefile('wb') as wfile:
+        _send(wfile, {'type': 'hello', 'worker': name, 'token': token,
+                      'nmap_version': nmap_version})
+        reply = _recv(rfile)
+        if reply.get('type') != 'welcome':
+            raise ConnectionError(reply.get('message', 'rejected by coordinator'))
+
+        shard = None
+        try:
+            while True:
+                _send(wfile, {'type': 'get'})
+                message = _recv(rfile)
+                if message['type'] == 'done':
+                    break
+                if message['type'] == 'wait':
+                    time.sleep(message.get('seconds', 1))
+                    continue
+                if message['type'] != 'shard':
+                    raise RuntimeError(message.get('message', 'unexpected message'))
+
+                shard = message['shard']
+                results = {}
+                scanned = 0
+                for target in message['targets']:
+                    target_results = scan_func(target)
+                    if target_results is None:
+                        continue
+                    scanned += 1
+                    for ip, host_data in target_results.items():
+                        results[ip] = HostRecord.from_dict(host_data).to_dict()
+                _send(wfile, {'type': 'result', 'shard': shard,
+                              'results': results, 'scanned': scanned})
+                _recv(rfile)
+                shard = None
+                completed += 1
+        except ConnectionError:
+            # 协调者在全部分片完成并等待 DONE_GRACE 秒后退出, 之后读到连接关闭属于正常结束;
+            # 此时仍在执行的只能是被其他节点先完成的重复分片
+            if shard is None:
+                print("[*] 协调者已关闭连接")
+            else:
+                print(f"[!] 协调者已关闭连接, 分片 #{shard} 的结果未送达")
+
+    print(f"[*] 工作节点 {name} 结束, 共完成 {completed} 个分片")
+    return completed
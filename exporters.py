@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式结果导出模块
+将扫描结果以 JSON Lines / CSV 格式边扫描边写出,便于 SIEM 和资产库导入
+
+- JSON Lines: 每个主机一行, 字段与 parse_nmap_xml() 返回的主机字典一致(额外带 ip);
+  已输出主机的补充结果(UDP通道晚于TCP通道完成)另起一行, 带 "update": true, 只含新增的端口
+- CSV: 每个开放端口一行的扁平表(主机/端口/服务)
+- 可选 gzip 压缩, 写入后立即 flush, 内存占用与结果总量无关
+- 作为结果输出管道(见 sinks.py)的输出, 在独立线程中写出
+
+Author: Security Researcher
+License: MIT
+"""
+
+import csv
+import gzip
+import json
+
+from result_model import to_plain
+
+
+def open_output(output_file, compress=False):
+    """
+    打开导出文件(文本模式)
+    :param output_file: 输出文件路径
+    :param compress: 是否使用gzip压缩(自动补全 .gz 后缀)
+    :return: (文件对象, 实际路径)
+    """
+    if compress:
+        if not output_file.endswith('.gz'):
+            output_file += '.gz'
+        return gzip.open(output_file, 'wt', encoding='utf-8', newline=''), output_file
+    return open(output_file, 'w', encoding='utf-8', newline=''), output_file
+
+
+class StreamExporter:
+    """流式导出器基类"""
+
+    format_name = ''
+
+    def __init__(self, output_file, compress=False):
+        """
+        初始化导出器
+        :param output_file: 输出文件路径
+        :param compress: 是否gzip压缩
+        """
+        self.output_file = output_file
+        self.compress = compress
+        self.hosts_written = 0
+        self.updates_written = 0
+        self._fp = None
+
+    @property
+    def name(self):
+        """输出名称(用于结果输出管道的统计, 见 sinks.py)"""
+        return f"{self.format_name}({self.output_file})"
+
+    def open(self):
+        """打开输出文件"""
+        if self._fp is None:
+            self._fp, self.output_file = open_output(self.output_file, self.compress)
+            self._write_header()
+        return self
+
+    def write_hosts(self, results):
+        """
+        写出一批主机结果
+        :param results: {ip: host_data} 格式, 同 parse_nmap_xml() 返回值
+        """
+        if self._fp is None:
+            self.open()
+        for ip, host_data in results.items():
+            self._write_host(ip, host_data)
+            self.hosts_written += 1
+        self._fp.flush()
+
+    def write_updates(self, results):
+        """
+        写出已输出主机的补充结果(不计入主机数)
+        :param results: {ip: host_data} 格式, 只含补充的端口
+        """
+        if self._fp is None:
+            self.open()
+        for ip, host_data in results.items():
+            self._write_update(ip, host_data)
+            self.updates_written += 1
+        self._fp.flush()
+
+    def close(self):
+        """关闭输出文件"""
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+            print(f"[+] {self.format_name}结果已保存至: {self.output_file} ({self.hosts_written} 个主机"
+                  + (f", {self.updates_written} 条补充记录" if self.updates_written else '') + ")")
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _write_header(self):
+        pass
+
+    def _write_host(self, ip, host_data):
+        raise NotImplementedError
+
+    def _write_update(self, ip, host_data):
+        self._write_host(ip, host_data)
+
+
+class JSONLinesExporter(StreamExporter):
+    """JSON Lines导出器, 每个主机一行"""
+
+    format_name = 'JSONL'
+
+    def _write_host(self, ip, host_data, update=False):
+        record = {
+            'ip': ip,
+            'hostnames': list(host_data['hostnames']),
+            'os': dict(host_data['os']) if host_data['os'] else None,
+            'ports': [to_plain(port_info) for port_info in host_data['ports']]
+        }
+        if update:
+            record['update'] = True
+        self._fp.write(json.dumps(record, ensure_ascii=False))
+        self._fp.write('\n')
+
+    def _write_update(self, ip, host_data):
+        self._write_host(ip, host_data, update=True)
+
+
+class CSVExporter(StreamExporter):
+    """CSV导出器, 每个开放端口一行"""
+
+    format_name = 'CSV'
+
+    FIELDS = ['ip', 'hostnames', 'os_name', 'os_accuracy', 'port', 'protocol',
+              'service', 'product', 'version', 'extra', 'scripts']
+
+    def _write_header(self):
+        self._writer = csv.writer(self._fp)
+        self._writer.writerow(self.FIELDS)
+
+    def _write_host(self, ip, host_data):
+        hostnames = ';'.join(host_data['hostnames'])
+        os_info = host_data['os'] or {}
+        for port_info in host_data['ports']:
+            scripts = port_info['scripts']
+            self._writer.writerow([
+                ip,
+                hostnames,
+                os_info.get('name', ''),
+                os_info.get('accuracy', ''),
+                port_info['port'],
+                port_info['protocol'],
+                port_info['service'],
+                port_info['product'],
+                port_info['version'],
+                port_info['extra'],
+                json.dumps([dict(script) for script in scripts], ensure_ascii=False) if scripts else ''
+            ])
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+全量扫描结果统计模块
+将所有主机的开放端口展开为 主机 x 端口 稀疏矩阵(坐标格式的 array 数组),
+再批量计算热门端口、热门服务、产品版本分布、各网段端口分布与网段 x 端口热力图
+
+安装了 NumPy 时使用 np.bincount 向量化计算, 否则退回标准库 array + Counter
+(同样在C层完成计数), 10万主机量级耗时在1秒以内
+
+Author: Security Researcher
+License: MIT
+"""
+
+import ipaddress
+from array import array
+from collections import Counter
+from operator import attrgetter, itemgetter
+
+from result_model import PortRecord
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def subnet_of(ip):
+    """返回IP所属网段(IPv4按/24, IPv6按/64)"""
+    if ':' not in ip:
+        return ip.rsplit('.', 1)[0] + '.0/24'
+    try:
+        return str(ipaddress.ip_network(f"{ip}/64", strict=False))
+    except ValueError:
+        return ip
+
+
+class _Codebook(dict):
+    """值 -> 连续整数编码(首次出现时分配)"""
+
+    def __missing__(self, key):
+        code = self[key] = len(self)
+        return code
+
+    def values_list(self):
+        """按编码顺序返回所有值"""
+        return list(self)
+
+
+# 端口记录签名: (端口, 协议, 服务, 产品, 版本)
+_SIGNATURE_FIELDS = ('port', 'protocol', 'service', 'product', 'version')
+_record_signature = attrgetter(*_SIGNATURE_FIELDS)
+_dict_signature = itemgetter(*_SIGNATURE_FIELDS)
+
+
+class FleetStatistics:
+    """全量扫描结果统计"""
+
+    def __init__(self, results, top_n=10):
+        """
+        :param results: 扫描结果字典 {ip: host_data}
+        :param top_n: Top-N 表格和热力图的条目数
+        """
+        self.top_n = top_n
+        self.host_count = len(results)
+        self._build(results)
+
+    def _build(self, results):
+        """
+        展开为坐标格式的 主机 x 端口 矩阵
+        每条端口记录只编码为一个"签名"整数, 端口/服务/产品统计再由签名计数汇总
+        """
+        signatures = _Codebook()
+        subnets = _Codebook()
+        host_subnet = array('I')     # 主机行号 -> 网段编号
+        record_subnet = array('I')   # 每条端口记录 -> 网段编号
+        record_sig = array('I')      # 每条端口记录 -> 签名编号
+
+        encode = signatures.__getitem__
+        for ip, host_data in results.items():
+            ports = host_data['ports']
+            subnet = subnets[subnet_of(ip)]
+            host_subnet.append(subnet)
+            if not ports:
+                continue
+            getter = _record_signature if isinstance(ports[0], PortRecord) else _dict_signature
+            record_sig.extend(map(encode, map(getter, ports)))
+            record_subnet.extend([subnet] * len(ports))
+
+        self.subnets = subnets.values_list()
+        self.total_ports = len(record_sig)
+
+        # 签名 -> 端口列/服务/产品 编码
+        ports, services, products = _Codebook(), _Codebook(), _Codebook()
+        sig_port, sig_service, sig_product = [], [], []
+        for port, protocol, service, product, version in signatures:
+            sig_port.append(ports[f"{port}/{protocol}"])
+            sig_service.append(services[service])
+            sig_product.append(products[f"{product} {version}".strip()])
+        self.ports = ports.values_list()
+        self.services = services.values_list()
+        self.products = products.values_list()
+
+        if np is not None:
+            sig_counts, cells = self._count_numpy(host_subnet, record_subnet, record_sig,
+                                                  len(signatures))
+        else:
+            sig_counts, cells = self._count_array(host_subnet, record_subnet, record_sig)
+
+        self.port_counts = [0] * len(self.ports)
+        self.service_counts = [0] * len(self.services)
+        self.product_counts = [0] * len(self.products)
+        for sig, count in enumerate(sig_counts):
+            self.port_counts[sig_port[sig]] += count
+            self.service_counts[sig_service[sig]] += count
+            self.product_counts[sig_product[sig]] += count
+
+        # (网段, 签名) -> (网段, 端口列)
+        self.subnet_port_totals = [0] * len(self.subnets)
+        self.subnet_port_cells = {}
+        n_ports = len(self.ports)
+        for (subnet, sig), count in cells:
+            self.subnet_port_totals[subnet] += count
+            key = subnet * n_ports + sig_port[sig]
+            self.subnet_port_cells[key] = self.subnet_port_cells.get(key, 0) + count
+
+    def _count_numpy(self, host_subnet, record_subnet, record_sig, n_sigs):
+        host_subnet = np.frombuffer(host_subnet, dtype=np.uint32)
+        record_subnet = np.frombuffer(record_subnet, dtype=np.uint32).astype(np.int64)
+        record_sig = np.frombuffer(record_sig, dtype=np.uint32)
+
+        self.subnet_host_counts = np.bincount(host_subnet, minlength=len(self.subnets)).tolist()
+        sig_counts = np.bincount(record_sig, minlength=n_sigs).tolist()
+        # 只统计实际出现的 (网段, 签名) 组合; 网段数 x 签名数 的稠密数组在分散的大规模扫描中过大
+        keys, counts = np.unique(record_subnet * n_sigs + record_sig, return_counts=True)
+        cells = zip(zip((keys // n_sigs).tolist(), (keys % n_sigs).tolist()), counts.tolist())
+        return sig_counts, cells
+
+    def _count_array(self, host_subnet, record_subnet, record_sig):
+        host_counts = Counter(host_subnet)
+        self.subnet_host_counts = [host_counts.get(i, 0) for i in range(len(self.subnets))]
+        counts = Counter(record_sig)
+        sig_counts = [counts.get(i, 0) for i in range(max(counts) + 1)] if counts else []
+        cells = Counter(zip(record_subnet, record_sig)).items()
+        return sig_counts, cells
+
+    @staticmethod
+    def _top(values, counts, n, skip=()):
+        ranked = sorted(range(len(values)), key=lambda i: counts[i], reverse=True)
+        return [(values[i], counts[i]) for i in ranked if values[i] not in skip][:n]
+
+    def top_ports(self):
+        """开放最多的端口 [(端口/协议, 次数)]"""
+        return self._top(self.ports, self.port_counts, self.top_n)
+
+    def top_services(self):
+        """最常见的服务 [(服务名, 次数)]"""
+        return self._top(self.services, self.service_counts, self.top_n)
+
+    def top_products(self):
+        """最常见的产品版本 [(产品 版本, 次数)]"""
+        return self._top(self.products, self.product_counts, self.top_n, skip=('',))
+
+    def top_subnets(self):
+        """开放端口最多的网段 [(网段, 主机数, 端口数)]"""
+        ranked = sorted(range(len(self.subnets)),
+                        key=lambda i: self.subnet_port_totals[i], reverse=True)
+        return [(self.subnets[i], self.subnet_host_counts[i], self.subnet_port_totals[i])
+                for i in ranked[:self.top_n]]
+
+    def heatmap(self):
+        """
+        网段 x 端口 热力图(取Top-N网段与Top-N端口)
+        :return: (端口列表, [(网段, [各端口开放主机数])], 最大值)
+        """
+        port_idx = sorted(range(len(self.ports)),
+                          key=lambda i: self.port_counts[i], reverse=True)[:self.top_n]
+        subnet_idx = sorted(range(len(self.subnets)),
+                            key=lambda i: self.subnet_port_totals[i], reverse=True)[:self.top_n]
+        n_ports = len(self.ports)
+        rows = []
+        peak = 0
+        for s in subnet_idx:
+            cells = [self.subnet_port_cells.get(s * n_ports + p, 0) for p in port_idx]
+            peak = max([peak] + cells)
+            rows.append((self.subnets[s], cells))
+        return [self.ports[p] for p in port_idx], rows, peak
+
+
+def _benchmark(hosts=100000, ports_per_host=15):
+    """在合成数据上测量统计耗时"""
+    import random
+    import time
+
+    services = [('http', 'Apache httpd', '2.4'), ('ssh', 'OpenSSH', '8.2'),
+                ('https', 'nginx', '1.18'), ('mysql', 'MySQL', '5.7'), ('unknown', '', '')]
+    port_pool = [21, 22, 80, 443, 445, 3306, 3389, 5432, 6379, 8080, 8443, 9200, 27017]
+    rng = random.Random(0)
+    results = {}
+    for h in range(hosts):
+        ip = f"10.{h >> 16 & 255}.{h >> 8 & 255}.{h & 255}"
+        ports = []
+        for port in rng.sample(port_pool, min(ports_per_host, len(port_pool))):
+            name, product, version = rng.choice(services)
+            ports.append(PortRecord(port, 'tcp', name, product, version))
+        results[ip] = {'ports': ports}
+
+    start = time.perf_counter()
+    stats = FleetStatistics(results)
+    stats.top_ports(), stats.top_services(), stats.top_products(), stats.heatmap()
+    elapsed = time.perf_counter() - start
+    backend = 'numpy' if np is not None else 'array'
+    print(f"[*] {hosts} 个主机, {stats.total_ports} 条端口记录, 后端: {backend}")
+    print(f"[+] 统计耗时: {elapsed:.3f} 秒")
+
+
+if __name__ == '__main__':
+    _benchmark()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+报告片段缓存
+周期性的大规模扫描每次生成报告都要重新渲染全部主机卡片, 而两次扫描之间通常只有少数主机变化;
+本模块按主机缓存渲染好的HTML片段, 以主机结果数据的摘要为键:
+数据未变的主机直接复用片段, 只重新渲染变化的主机, 本次报告中不再出现的主机被淘汰
+
+存储分两部分:
+  <路径>          JSON索引 {主机: [摘要, 偏移, 长度]}
+  <路径>.data<N>  片段数据文件(只追加), 按偏移直接读取(mmap), 无需解析
+保存时只追加新渲染的片段; 失效数据超过有效数据时整理为新一代数据文件(先写新文件再切换索引)
+片段模板版本变化时整个缓存失效
+
+Author: Security Researcher
+License: MIT
+"""
+
+import hashlib
+import json
+import mmap
+import os
+
+CACHE_FORMAT_VERSION = 1
+
+
+def host_digest(host_data):
+    """主机结果数据的摘要"""
+    os_info = host_data['os']
+    parts = [repr(host_data['hostnames']),
+             repr((os_info['name'], os_info['accuracy']) if os_info else None)]
+    for port in host_data['ports']:
+        parts.append(repr((port['port'], port['protocol'], port['service'], port['product'],
+                           port['version'], port['extra'],
+                           [(script['id'], script['output']) for script in port['scripts']])))
+    return hashlib.blake2b('\n'.join(parts).encode('utf-8'), digest_size=16).hexdigest()
+
+
+class FragmentCache:
+    """按主机缓存的HTML片段"""
+
+    def __init__(self, path, version):
+        """
+        :param path: 缓存索引文件路径(不存在时从空缓存开始)
+        :param version: 片段模板版本, 与缓存记录的版本不同时丢弃旧缓存
+        """
+        self.path = path
+        self.version = version
+        self.entries = {}   # 主机 -> [摘要, 偏移, 长度]
+        self.generation = 0
+        self._data = None   # 数据文件的mmap
+        self._data_file = None
+        self._indexed_size = 0  # 索引记录的数据文件有效长度, 之后的内容是中断的保存留下的残余
+        self._pending = {}  # 主机 -> [摘要, 片段字节], 尚未写入数据文件
+        self._touched = set()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        if path and os.path.exists(path):
+            self.load()
+
+    def _data_path(self, generation):
+        return f"{self.path}.data{generation}"
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if (index.get('format') != CACHE_FORMAT_VERSION
+                    or index.get('version') != self.version):
+                return
+            generation = index['generation']
+            data_file = open(self._data_path(generation), 'rb')
+        except (OSError, ValueError, KeyError):
+            print(f"[!] 报告缓存 {self.path} 无法读取, 将重新生成")
+            return
+
+        size = os.fstat(data_file.fileno()).st_size
+        if size < index.get('size', 0) or size == 0:
+            data_file.close()
+            return
+        self._data_file = data_file
+        self._data = mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._indexed_size = index.get('size', size)
+        self.generation = generation
+        self.entries = index['entries']
+
+    def close(self):
+        if self._data is not None:
+            self._data.close()
+            self._data_file.close()
+            self._data = self._data_file = None
+
+    def fragment(self, key, host_data, render):
+        """
+        获取主机片段, 数据变化或未缓存时调用 render() 重新渲染
+        :param key: 主机键(IP)
+        :param host_data: 主机结果
+        :param render: 无参渲染函数
+        :return: HTML片段
+        """
+        self._touched.add(key)
+        digest = host_digest(host_data)
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == digest:
+            self.hits += 1
+            offset, length = entry[1], entry[2]
+            return self._data[offset:offset + length].decode('utf-8')
+        self.misses += 1
+        fragment = render()
+        self.entries.pop(key, None)
+        self._pending[key] = [digest, fragment.encode('utf-8')]
+        return fragment
+
+    def save(self):
+        """淘汰本次未使用的主机, 追加新片段(必要时整理数据文件)并写出索引"""
+        stale = [key for key in self.entries if key not in self._touched]
+        for key in stale:
+            del self.entries[key]
+        self.evicted += len(stale)
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        live = sum(entry[2] for entry in self.entries.values())
+        size = self._indexed_size if self._data is not None else 0
+        if size - live > live:
+            self._compact()
+        else:
+            # 片段都已读出; 先释放mmap, 部分平台不允许截断已映射的文件
+            self.close()
+            self._append(self._data_path(self.generation), size)
+
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'format': CACHE_FORMAT_VERSION, 'version': self.version,
+                       'generation': self.generation, 'size': self._size,
+                       'entries': self.entries}, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+        self._pending = {}
+
+        if self._old_data_path is not None:
+            try:
+                os.unlink(self._old_data_path)
+            except OSError:
+                pass
+        self.close()
+
+    def _append(self, data_path, offset):
+        """把新片段追加到数据文件末尾(截掉上次保存后可能残留的未索引数据)"""
+        self._old_data_path = None
+        with open(data_path, 'ab') as f:
+            f.truncate(offset)
+            f.seek(offset)
+            for key, (digest, data) in self._pending.items():
+                self.entries[key] = [digest, offset, len(data)]
+                f.write(data)
+                offset += len(data)
+        self._size = self._indexed_size = offset
+
+    def _compact(self):
+        """把有效片段写入新一代数据文件"""
+        old_path = self._data_path(self.generation) if self._data is not None else None
+        self.generation += 1
+        offset = 0
+        with open(self._data_path(self.generation), 'wb') as f:
+            for key, entry in self.entries.items():
+                data = self._data[entry[1]:entry[1] + entry[2]]
+                self.entries[key] = [entry[0], offset, len(data)]
+                f.write(data)
+                offset += len(data)
+        self._append(self._data_path(self.generation), offset)
+        self._old_data_path = old_path
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+扫描历史存储
+按主机记录最近一次的扫描结果, 按目标记录最近扫描时间及其包含的主机,
+供持续监控(变化检测)等功能使用; 以JSON文件保存(.gz 后缀时自动压缩), 原子替换写入
+
+Author: Security Researcher
+License: MIT
+"""
+
+import gzip
+import json
+import os
+import time
+
+from result_model import HostRecord, to_plain
+
+HISTORY_FORMAT_VERSION = 1
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class ScanHistory:
+    """扫描历史"""
+
+    def __init__(self, path):
+        """
+        :param path: 历史文件路径(不存在时从空历史开始)
+        """
+        self.path = path
+        self.hosts = {}      # ip -> {'data': 主机结果字典, 'last_seen': 时间戳}
+        self.targets = {}    # 目标 -> {'last_scanned': 时间戳, 'hosts': [ip, ...]}
+        self.dirty = False
+        if path and os.path.exists(path):
+            self.load()
+
+    def load(self):
+        with _open(self.path, 'r') as f:
+            data = json.load(f)
+        if data.get('version') != HISTORY_FORMAT_VERSION:
+            raise ValueError(f"不支持的历史文件版本: {data.get('version')}")
+        self.hosts = data.get('hosts', {})
+        self.targets = data.get('targets', {})
+        self.dirty = False
+
+    def save(self):
+        """保存历史(先写临时文件再替换, 中断时不会损坏原文件)"""
+        if not self.path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with _open(tmp_path, 'w') as f:
+            json.dump({'version': HISTORY_FORMAT_VERSION, 'hosts': self.hosts,
+                       'targets': self.targets}, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def host(self, ip):
+        """返回主机最近一次结果(HostRecord), 未知主机返回None"""
+        entry = self.hosts.get(ip)
+        return HostRecord.from_dict(entry['data']) if entry else None
+
+    def target(self, target):
+        """返回目标的历史信息, 未扫描过返回None"""
+        return self.targets.get(target)
+
+    def record(self, target, results, when=None):
+        """
+        记录目标的一次扫描结果
+        :param target: 目标
+        :param results: parse_nmap_xml() 格式的结果字典
+        :param when: 扫描时间戳(默认当前时间)
+        :return: 该目标上一次扫描发现的主机列表(本次未发现的主机会从历史中移除)
+        """
+        when = when or time.time()
+        previous = self.targets.get(target, {}).get('hosts', [])
+        for ip in previous:
+            if ip not in results:
+                self.hosts.pop(ip, None)
+        for ip, host_data in results.items():
+            self.hosts[ip] = {'data': to_plain(host_data), 'last_seen': when}
+        self.targets[target] = {'last_scanned': when, 'hosts': sorted(results)}
+        self.dirty = True
+        return previous
@@ -4,54 +4,139 @@
 HTML报告生成模块
 负责将扫描结果生成美观的HTML报告
 
+紧凑模式(compact)用于长期归档大量报告:
+  - CSS/JS 写入共享的外部资源目录(文件名含内容哈希, 可长期缓存), 不再内联到每份报告
+  - 主机卡片和端口行使用类名代替内联样式, 去除空白
+  - 额外输出预压缩的 .html.gz
+运行 `python html_report.py` 可比较两种格式的报告大小
+
 Author: Security Researcher
 License: MIT
 """
 
 from datetime import datetime
+from contextlib import contextmanager
+import gzip
+import hashlib
 import html
+import os
+import re
+
+# 主机卡片模板版本, 修改 _build_host_card/_build_ports_rows 的输出时递增, 使片段缓存失效
+FRAGMENT_VERSION = 1
+
+# 紧凑模式资源目录(相对报告所在目录)
+ASSETS_DIR = 'report-assets'
+
+# 紧凑模式下代替端口行内联样式的类
+_COMPACT_CSS = ('.col-idx{width:60px;text-align:center}.col-port{width:100px}'
+                '.proto{color:#999;font-size:.85em}')
+
+
+def _minify_html(text):
+    """去除标签间与行首的空白(只用于不含预格式化内容的模板片段)"""
+    return re.sub(r'>\s+<', '><', re.sub(r'\s*\n\s*', '', text))
+
+
+def _minify_css(text):
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{};,])\s*', r'\1', text)
+    return text.replace(': ', ':').replace(';}', '}').strip()
+
+
+def _minify_js(text):
+    """去除注释行和缩进(保留换行, 不依赖分号补全规则)"""
+    lines = (line.strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+
+@contextmanager
+def _no_phase(name):
+    yield
 
 
 class HTMLReportGenerator:
     """HTML报告生成器"""
     
-    def __init__(self, results, scan_info):
+    def __init__(self, results, scan_info, phase=None, fragment_cache=None, compact=False):
         """
         初始化报告生成器
         :param results: 扫描结果字典
         :param scan_info: 扫描信息字典，包含开始时间、结束时间等
+        :param phase: 性能剖析阶段上下文工厂 phase(name), 为None时不剖析
+        :param fragment_cache: FragmentCache 实例(见 fragment_cache.py), 复用未变化主机的卡片;
+                               版本应使用 fragment_version(compact)
+        :param compact: 紧凑模式(外部资源、紧凑标记、额外输出 .html.gz)
         """
         self.results = results
         self.scan_info = scan_info
+        self.phase = phase or _no_phase
+        self.fragment_cache = fragment_cache
+        self.compact = compact
+        self.asset_links = ''
+    
+    @staticmethod
+    def fragment_version(compact=False):
+        """片段缓存版本(两种格式的主机卡片不能混用)"""
+        return f"{FRAGMENT_VERSION}{'c' if compact else ''}"
     
     def generate(self, output_file):
         """
         生成HTML报告
         :param output_file: 输出文件路径
         """
-        html_content = self._build_html()
-        
         try:
+            if self.compact:
+                self.asset_links = self._write_assets(os.path.dirname(os.path.abspath(output_file)))
+            html_content = self._build_html()
             with open(output_file, 'w', encoding='utf-8', errors='ignore') as f:
                 f.write(html_content)
             print(f"\n[+] HTML报告已保存至: {output_file}")
+            if self.compact:
+                data = html_content.encode('utf-8', errors='ignore')
+                with gzip.GzipFile(output_file + '.gz', 'wb', compresslevel=9, mtime=0) as f:
+                    f.write(data)
+                print(f"[+] 压缩报告已保存至: {output_file}.gz "
+                      f"({len(data) / 1024:.1f} KB -> {os.path.getsize(output_file + '.gz') / 1024:.1f} KB)")
         except Exception as e:
             print(f"[!] 保存报告时出错: {e}")
+            return
+        
+        cache = self.fragment_cache
+        if cache is not None:
+            try:
+                cache.save()
+            except OSError as e:
+                print(f"[!] 保存报告缓存时出错: {e}")
+            print(f"[*] 报告缓存: 复用 {cache.hits} 个主机, 重新渲染 {cache.misses} 个, "
+                  f"淘汰 {cache.evicted} 个")
     
     def _build_html(self):
         """构建完整的HTML内容"""
-        host_details_html = self._build_host_details()
+        with self.phase('report.host_details'):
+            host_details_html = self._build_host_details()
+        with self.phase('report.statistics'):
+            try:
+                statistics_html = self._build_statistics()
+            except Exception as e:
+                # 统计只是附加内容, 失败时仍输出主机详情
+                print(f"[!] 生成统计信息时出错, 报告中省略统计部分: {e}")
+                statistics_html = ''
         total_ports = sum(len(host_data['ports']) for host_data in self.results.values())
         
         duration = (self.scan_info['end_time'] - self.scan_info['start_time']).total_seconds()
         
-        return self._get_html_template().format(
+        template = self._get_compact_template() if self.compact else self._get_html_template()
+        return template.format(
             nmap_version=self.scan_info.get('nmap_version', 'Nmap'),
             total_scanned=self.scan_info.get('total_scanned', 0),
             alive_hosts=len(self.results),
             total_ports=total_ports,
             duration=f"{duration:.2f}s",
+            statistics=statistics_html,
             host_details=host_details_html,
+            assets=self.asset_links,
             start_time=self.scan_info['start_time'].strftime('%Y-%m-%d %H:%M:%S'),
             end_time=self.scan_info['end_time'].strftime('%Y-%m-%d %H:%M:%S'),
             generate_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -62,27 +147,38 @@ class HTMLReportGenerator:
         if not self.results:
             return '<div class="no-results">😔 未发现开放端口或存活主机</div>'
         
+        cache = self.fragment_cache
+        build = self._build_host_card_compact if self.compact else self._build_host_card
         html_parts = []
         
         for ip, host_data in sorted(self.results.items()):
-            ports = host_data['ports']
-            
-            # 主机名
-            hostnames = ', '.join(host_data['hostnames']) if host_data['hostnames'] else ''
-            hostname_html = f'<div class="hostname">🏷️ {hostnames}</div>' if hostnames else ''
-            
-            # 操作系统信息
-            os_html = ''
-            if host_data['os']:
-                os_name = host_data['os']['name']
-                os_accuracy = host_data['os']['accuracy']
-                os_html = f'<div class="os-info">💻 {os_name} ({os_accuracy}%)</div>'
-            
-            # 构建端口表格行
-            ports_rows = self._build_ports_rows(ports)
-            
-            # 组装主机卡片
-            host_card = f"""
+            if cache is None:
+                html_parts.append(build(ip, host_data))
+            else:
+                html_parts.append(cache.fragment(ip, host_data, lambda: build(ip, host_data)))
+        
+        return ('' if self.compact else '\n').join(html_parts)
+    
+    def _build_host_card(self, ip, host_data):
+        """构建单个主机卡片HTML"""
+        ports = host_data['ports']
+        
+        # 主机名
+        hostnames = ', '.join(host_data['hostnames']) if host_data['hostnames'] else ''
+        hostname_html = f'<div class="hostname">🏷️ {hostnames}</div>' if hostnames else ''
+        
+        # 操作系统信息
+        os_html = ''
+        if host_data['os']:
+            os_name = host_data['os']['name']
+            os_accuracy = host_data['os']['accuracy']
+            os_html = f'<div class="os-info">💻 {os_name} ({os_accuracy}%)</div>'
+        
+        # 构建端口表格行
+        ports_rows = self._build_ports_rows(ports)
+        
+        # 组装主机卡片
+        return f"""
             <div class="host-card">
                 <div class="host-header" onclick="toggleHost(this)">
                     <div class="host-info">
@@ -109,10 +205,110 @@ class HTMLReportGenerator:
                     </table>
                 </div>
             </div>"""
+    
+    def _build_host_card_compact(self, ip, host_data):
+        """构建单个主机卡片HTML(紧凑模式: 类名代替内联样式, 无空白)"""
+        ports = host_data['ports']
+        hostname_html = (f'<div class="hostname">🏷️ {", ".join(host_data["hostnames"])}</div>'
+                         if host_data['hostnames'] else '')
+        os_html = ''
+        if host_data['os']:
+            os_html = f'<div class="os-info">💻 {host_data["os"]["name"]} ({host_data["os"]["accuracy"]}%)</div>'
+        return (f'<div class="host-card"><div class="host-header" onclick="toggleHost(this)">'
+                f'<div class="host-info"><h3>📡 {ip} <span class="toggle-icon collapsed">▼</span></h3>'
+                f'{hostname_html}</div><div class="host-meta"><span class="port-badge">{len(ports)} 个开放端口</span>'
+                f'{os_html}</div></div><div class="ports-content"><table class="ports-table"><thead><tr>'
+                f'<th class="col-idx">#</th><th class="col-port">端口/协议</th><th>服务详情</th>'
+                f'</tr></thead><tbody>{self._build_ports_rows_compact(ports)}</tbody></table></div></div>')
+    
+    def _build_ports_rows_compact(self, ports):
+        """构建端口表格行(紧凑模式)"""
+        rows = []
+        for idx, port_info in enumerate(ports, 1):
+            service_full = port_info['service']
+            if port_info['product']:
+                service_full += f" - {port_info['product']}"
+            if port_info['version']:
+                service_full += f" {port_info['version']}"
+            if port_info['extra']:
+                service_full += f" ({port_info['extra']})"
             
-            html_parts.append(host_card)
-        
-        return '\n'.join(html_parts)
+            badge_class = self._get_service_badge(port_info['service'])
+            service_badge = f'<span class="badge {badge_class}">{port_info["service"]}</span>' if badge_class else ''
+            scripts_html = ''.join(
+                f'<div class="script-output"><div class="script-title">📜 {script["id"]}</div>{script["output"]}</div>'
+                for script in port_info['scripts'])
+            
+            rows.append(f'<tr><td class="col-idx">{idx}</td><td class="col-port">'
+                        f'<span class="port-number">{port_info["port"]}</span>'
+                        f'<div class="proto">{port_info["protocol"]}</div></td>'
+                        f'<td>{service_badge}<span class="service-name">{port_info["service"]}</span>'
+                        f'<div class="service-detail">{service_full}</div>{scripts_html}</td></tr>')
+        return ''.join(rows)
+    
+    def _build_statistics(self):
+        """构建全局统计: Top-N表格和网段x端口热力图"""
+        if not self.results:
+            return ''
+        
+        # 统计模块可能加载NumPy, 仅在生成报告时导入
+        from fleet_stats import FleetStatistics
+        
+        stats = FleetStatistics(self.results)
+        
+        def top_table(title, header, items):
+            rows = ''.join(
+                f'<tr><td>{html.escape(str(name))}</td><td class="num">{count}</td></tr>'
+                for name, count in items)
+            return f"""
+                <div class="stats-card">
+                    <h3>{title}</h3>
+                    <table class="stats-table">
+                        <thead><tr><th>{header}</th><th class="num">数量</th></tr></thead>
+                        <tbody>{rows}</tbody>
+                    </table>
+                </div>"""
+        
+        subnet_rows = ''.join(
+            f'<tr><td>{html.escape(subnet)}</td><td class="num">{hosts}</td><td class="num">{ports}</td></tr>'
+            for subnet, hosts, ports in stats.top_subnets())
+        subnet_table = f"""
+                <div class="stats-card">
+                    <h3>🌐 网段分布</h3>
+                    <table class="stats-table">
+                        <thead><tr><th>网段</th><th class="num">主机</th><th class="num">端口</th></tr></thead>
+                        <tbody>{subnet_rows}</tbody>
+                    </table>
+                </div>"""
+        
+        # 热力图: 颜色深浅表示该网段中开放此端口的主机数
+        heat_ports, heat_rows, peak = stats.heatmap()
+        heat_header = ''.join(f'<th>{html.escape(port)}</th>' for port in heat_ports)
+        heat_body = []
+        for subnet, cells in heat_rows:
+            tds = ''.join(
+                f'<td style="background: rgba(102, 126, 234, {count / peak if peak else 0:.2f});">{count or ""}</td>'
+                for count in cells)
+            heat_body.append(f'<tr><th class="heat-label">{html.escape(subnet)}</th>{tds}</tr>')
+        
+        section = f"""
+        <div class="stats-section">
+            <h2>📈 统计分析</h2>
+            <div class="stats-grid">
+                {top_table('🔝 热门端口', '端口/协议', stats.top_ports())}
+                {top_table('🧩 热门服务', '服务', stats.top_services())}
+                {top_table('📦 产品版本', '产品', stats.top_products())}
+                {subnet_table}
+            </div>
+            <div class="stats-card heatmap-card">
+                <h3>🔥 网段 x 端口 热力图</h3>
+                <table class="heatmap">
+                    <thead><tr><th></th>{heat_header}</tr></thead>
+                    <tbody>{''.join(heat_body)}</tbody>
+                </table>
+            </div>
+        </div>"""
+        return _minify_html(section) if self.compact else section
     
     def _build_ports_rows(self, ports):
         """构建端口表格行"""
@@ -173,6 +369,43 @@ class HTMLReportGenerator:
             return 'badge-database'
         return ''
     
+    @classmethod
+    def _get_assets(cls):
+        """从完整模板中提取CSS/JS, 压缩后作为外部资源"""
+        template = cls._get_html_template().replace('{{', '{').replace('}}', '}')
+        css = template.split('<style>', 1)[1].split('</style>', 1)[0]
+        js = template.split('<script>', 1)[1].split('</script>', 1)[0]
+        return _minify_css(css) + _COMPACT_CSS, _minify_js(js)
+    
+    @classmethod
+    def _write_assets(cls, report_dir):
+        """
+        写出外部资源(文件名含内容哈希, 内容相同的报告共用同一组文件)
+        :return: 引用资源的HTML标签
+        """
+        asset_dir = os.path.join(report_dir, ASSETS_DIR)
+        os.makedirs(asset_dir, exist_ok=True)
+        links = []
+        for content, ext in zip(cls._get_assets(), ('css', 'js')):
+            data = content.encode('utf-8')
+            name = f"report.{hashlib.sha256(data).hexdigest()[:12]}.{ext}"
+            path = os.path.join(asset_dir, name)
+            if not os.path.exists(path):
+                with open(path, 'wb') as f:
+                    f.write(data)
+            href = f"{ASSETS_DIR}/{name}"
+            links.append(f'<link rel="stylesheet" href="{href}">' if ext == 'css'
+                         else f'<script src="{href}"></script>')
+        return ''.join(links)
+    
+    @classmethod
+    def _get_compact_template(cls):
+        """紧凑模式模板: 外部资源 + 去除空白"""
+        template = cls._get_html_template()
+        head, rest = template.split('<style>', 1)
+        tail = rest.split('</script>', 1)[1]
+        return _minify_html(head + '{assets}' + tail)
+    
     @staticmethod
     def _get_html_template():
         """返回HTML模板"""
@@ -272,6 +505,75 @@ class HTMLReportGenerator:
             padding: 30px;
         }}
         
+        .stats-section {{
+            padding: 30px 30px 0;
+        }}
+        
+        .stats-section h2 {{
+            margin-bottom: 20px;
+            color: #333;
+            font-size: 1.8em;
+        }}
+        
+        .stats-grid {{
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(280px, 1fr));
+            gap: 20px;
+            margin-bottom: 20px;
+        }}
+        
+        .stats-card {{
+            background: white;
+            border: 2px solid #e0e0e0;
+            border-radius: 12px;
+            padding: 15px 20px;
+        }}
+        
+        .stats-card h3 {{
+            color: #764ba2;
+            font-size: 1.1em;
+            margin-bottom: 10px;
+        }}
+        
+        .stats-table {{
+            width: 100%;
+            border-collapse: collapse;
+            font-size: 0.9em;
+        }}
+        
+        .stats-table th, .stats-table td {{
+            padding: 6px 8px;
+            text-align: left;
+            border-bottom: 1px solid #e0e0e0;
+        }}
+        
+        .stats-table .num {{
+            text-align: right;
+            color: #667eea;
+            font-weight: 600;
+        }}
+        
+        .heatmap-card {{
+            overflow-x: auto;
+        }}
+        
+        .heatmap {{
+            border-collapse: collapse;
+            font-size: 0.85em;
+        }}
+        
+        .heatmap th, .heatmap td {{
+            padding: 6px 10px;
+            text-align: center;
+            border: 1px solid #f0f0f0;
+            white-space: nowrap;
+        }}
+        
+        .heatmap .heat-label {{
+            text-align: left;
+            color: #333;
+        }}
+        
         .controls {{
             margin-bottom: 20px;
             display: flex;
@@ -621,7 +923,7 @@ class HTMLReportGenerator:
                 <div class="value">{duration}</div>
             </div>
         </div>
-        
+        {statistics}
         <div class="content">
             <h2 style="margin-bottom: 20px; color: #333; font-size: 1.8em;">📊 扫描详情</h2>
             <div class="controls">
@@ -646,3 +948,45 @@ class HTMLReportGenerator:
     </div>
 </body>
 </html>"""
+
+
+def _benchmark(hosts=2000, ports_per_host=15):
+    """比较完整格式与紧凑格式的报告大小"""
+    import tempfile
+    from result_model import HostRecord, PortRecord
+
+    services = [('http', 'Apache httpd', '2.4.41'), ('ssh', 'OpenSSH', '8.2p1'),
+                ('https', 'nginx', '1.18.0'), ('mysql', 'MySQL', '5.7.33')]
+    results = {}
+    for h in range(hosts):
+        ip = f"10.{h >> 16 & 255}.{h >> 8 & 255}.{h & 255}"
+        results[ip] = HostRecord([], None, [
+            PortRecord(p * 7 + h % 5, 'tcp', *services[p % len(services)])
+            for p in range(1, ports_per_host + 1)])
+    now = datetime.now()
+    scan_info = {'start_time': now, 'end_time': now, 'total_scanned': hosts, 'nmap_version': 'Nmap'}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        full_path = os.path.join(tmp, 'full.html')
+        compact_path = os.path.join(tmp, 'compact.html')
+        HTMLReportGenerator(results, scan_info).generate(full_path)
+        HTMLReportGenerator(results, scan_info, compact=True).generate(compact_path)
+
+        with open(full_path, 'rb') as f:
+            full_gz = len(gzip.compress(f.read(), 9))
+        full = os.path.getsize(full_path)
+        sizes = [
+            ('完整格式 .html', full),
+            ('完整格式 gzip', full_gz),
+            ('紧凑格式 .html', os.path.getsize(compact_path)),
+            ('紧凑格式 .html.gz', os.path.getsize(compact_path + '.gz')),
+            ('共享资源(一次)', sum(os.path.getsize(os.path.join(tmp, ASSETS_DIR, name))
+                              for name in os.listdir(os.path.join(tmp, ASSETS_DIR)))),
+        ]
+    print(f"\n[*] {hosts} 个主机 x {ports_per_host} 个端口:")
+    for label, size in sizes:
+        print(f"    {label:<16} {size / 1024:>10.1f} KB  ({size / full:6.1%})")
+
+
+if __name__ == '__main__':
+    _benchmark()
@@ -11,15 +11,17 @@ License: MIT
 Repository: https://github.com/yourusername/nmap-scanner
 """
 
-import subprocess
 import argparse
-import xml.etree.ElementTree as ET
 from datetime import datetime
 import sys
 import os
-import tempfile
 import platform
-from html_report import HTMLReportGenerator
+import threading
+from contextlib import contextmanager
+from result_model import PortRecord, HostRecord, make_os_info, merge_hosts
+
+# 说明: 子进程/临时文件/线程池、Nmap探测、XML解析、HTML报告、导出器、结果输出管道、端口索引等
+# 较重的模块在实际用到时再导入, 以加快启动(--help、--learn-profile 等不扫描的模式不加载)
 
 # 版本信息
 __version__ = '2.0.0'
@@ -45,6 +47,20 @@ COMMON_PORTS = {
     9090: 'WebSphere', 9200: 'Elasticsearch', 9300: 'Elasticsearch-Transport',
     11211: 'Memcached', 27017: 'MongoDB', 50000: 'SAP', 50070: 'Hadoop',
 }
+COMMON_PORTS_ARG = ','.join(map(str, sorted(COMMON_PORTS)))
+
+# 并行扫描时UDP通道在内存中保留的积压任务数, 超出部分暂存到临时文件(见 spill_queue.py)
+LANE_BACKLOG_LIMIT = 1024
+
+# 常见UDP端口(UDP扫描很慢, 只探测最常暴露服务的端口)
+TOP_UDP_PORTS = {
+    53: 'DNS', 67: 'DHCP', 69: 'TFTP', 111: 'RPC', 123: 'NTP',
+    137: 'NetBIOS-NS', 138: 'NetBIOS-DGM', 161: 'SNMP', 162: 'SNMP-Trap',
+    500: 'IKE', 514: 'Syslog', 520: 'RIP', 623: 'IPMI', 1194: 'OpenVPN',
+    1434: 'MSSQL-Monitor', 1900: 'SSDP', 2049: 'NFS', 4500: 'IPsec-NAT-T',
+    5060: 'SIP', 5353: 'mDNS', 11211: 'Memcached',
+}
+TOP_UDP_PORTS_ARG = ','.join(map(str, sorted(TOP_UDP_PORTS)))
 
 
 class NmapScanner:
@@ -52,51 +68,129 @@ class NmapScanner:
     
     def __init__(self, targets_file, output_file='scan_report.html', 
                  ports=None, scan_type='default', service_detect=True,
-                 os_detect=False, script_scan=False, aggressive=False):
+                 os_detect=False, script_scan=False, aggressive=False,
+                 exporters=None, keep_results=True, refresh_nmap_cache=False,
+                 profiler=None, parallel=1, order='file', batch_hosts=0,
+                 history_file=None, udp_scan=False, udp_ports=None, udp_parallel=2,
+                 udp_retries=1, udp_rate=None, resolver=None, port_shards=1,
+                 profiles_file='port_profiles.json', report_cache=None, compact_report=False,
+                 sinks=None, sink_queue=64, build_index=False):
         """
         初始化扫描器
-        :param targets_file: 目标文件路径
+        :param targets_file: 目标文件路径('-' 表示标准输入, 支持gzip压缩文件)
         :param output_file: 输出HTML报告路径
-        :param ports: 要扫描的端口(格式: "80,443" 或 "1-1000" 或 None表示常见端口)
+        :param ports: 要扫描的端口(格式: "80,443" 或 "1-1000" 或 "profile:名称" 或 None表示常见端口)
         :param scan_type: 扫描类型 (default/quick/full/stealth)
         :param service_detect: 是否进行服务版本探测
         :param os_detect: 是否进行操作系统探测
         :param script_scan: 是否运行默认脚本扫描
         :param aggressive: 是否使用激进模式(-A)
+        :param exporters: 流式导出器列表(见 exporters.py), 每个目标扫描完成后立即写出
+                          (经结果输出管道, 见 sinks.py)
+        :param keep_results: 是否在内存中保留全部结果(生成HTML报告需要)
+        :param refresh_nmap_cache: 忽略缓存重新探测Nmap版本与能力
+        :param profiler: PhaseProfiler 实例(见 profiler.py), 为None时不剖析
+        :param parallel: 同时运行的Nmap进程数
+        :param order: 目标顺序, 'file' 按文件顺序, 'interleave' 跨网段交错(见 ordering.py),
+                      'priority' 按历史结果优先级(见 priority.py)
+        :param batch_hosts: >0 时每次Nmap调用扫描多少个主机(配合 --randomize-hosts)
+        :param history_file: 扫描历史文件, 'priority' 顺序据此排序并在扫描后更新
+        :param udp_scan: 是否同时进行UDP扫描(独立于TCP的扫描通道)
+        :param udp_ports: UDP端口(None表示常见UDP端口)
+        :param udp_parallel: 同时运行的UDP扫描进程数
+        :param udp_retries: UDP探测最大重传次数(--max-retries)
+        :param udp_rate: UDP发包速率上限(包/秒, --max-rate), None表示不限制
+        :param resolver: Resolver 实例(见 resolver.py), 设置后域名目标在扫描前并发解析并按IP去重
+        :param port_shards: TCP端口范围切分的段数, >1 时每个目标由多个Nmap进程并行做端口发现,
+                            再对发现的开放端口做一次服务识别(见 port_shards.py)
+        :param profiles_file: 端口配置文件(见 port_profiles.py), 用于展开 "profile:名称"
+        :param report_cache: HTML报告片段缓存文件(见 fragment_cache.py), 重复生成报告时只渲染变化的主机
+        :param compact_report: 紧凑报告(外部共享资源、紧凑标记、额外输出 .html.gz)
+        :param sinks: 额外的结果输出列表(见 sinks.py), 与流式导出器一起并发消费扫描结果
+        :param sink_queue: 每个结果输出的队列容量, 输出跟不上时扫描等待
+        :param build_index: 是否建立开放端口位图索引(见 port_index.py, --save-index/--diff-index 需要);
+                            索引随主机数增长, 不需要时不建立, 保持 --no-html 时内存与结果量无关
+        
+        Nmap检查推迟到第一次扫描前进行(见 check_nmap), 不扫描的运行模式无需启动nmap进程
         """
         self.targets_file = targets_file
         self.output_file = output_file
+        if ports and ports.startswith('profile:'):
+            from port_profiles import resolve_ports
+            ports = resolve_ports(ports, profiles_file)
         self.ports = ports
         self.scan_type = scan_type
         self.service_detect = service_detect
         self.os_detect = os_detect
         self.script_scan = script_scan
         self.aggressive = aggressive
+        # 结果输出管道, 没有任何输出时不创建(见 sinks.py)
+        self.sinks = None
+        if exporters or sinks:
+            from sinks import SinkPipeline
+            self.sinks = SinkPipeline(list(exporters or []) + list(sinks or []), sink_queue)
+        self.keep_results = keep_results
         self.results = {}
+        self.invalid_targets = 0
+        self.port_index = None
+        if build_index:
+            from port_index import PortIndex
+            self.port_index = PortIndex()
+        self.alive_hosts = 0
+        self.total_ports = 0
         self.start_time = None
         self.end_time = None
         self.total_scanned = 0
         self.nmap_version = None
-        
-        # 检查Nmap是否安装
-        self.check_nmap()
+        self.nmap_path = None
+        self.nmap_caps = None
+        self.refresh_nmap_cache = refresh_nmap_cache
+        self.profiler = profiler
+        self.parallel = max(1, parallel)
+        self.order = order
+        self.batch_hosts = batch_hosts
+        self.history_file = history_file
+        self.history = None
+        self.udp_scan = udp_scan
+        self.udp_ports = udp_ports
+        self.udp_parallel = max(1, udp_parallel)
+        self.udp_retries = udp_retries
+        self.udp_rate = udp_rate
+        self.resolver = resolver
+        self.host_aliases = {}  # ip -> 解析到该IP的域名列表
+        self._alias_counts = {}  # 开启预解析时: 已发布主机的ip -> 发布时已附加的域名数
+        self.port_shards = max(1, port_shards)
+        self.report_cache = report_cache
+        self.compact_report = compact_report
+        self._port_chunks = None
+        # 多个Nmap进程同时运行时不逐行转发Nmap输出, 避免交错
+        self.concurrent = self.parallel > 1 or udp_scan or self.port_shards > 1
+    
+    @contextmanager
+    def phase(self, name, snapshot=True):
+        """性能剖析阶段(未开启 --profile 时为空操作; 剖析器只跟踪主线程)"""
+        if self.profiler is None or threading.current_thread() is not threading.main_thread():
+            yield
+        else:
+            with self.profiler.phase(name, snapshot=snapshot):
+                yield
     
     def check_nmap(self):
-        """检查Nmap是否安装并检测系统平台"""
-        nmap_cmd = 'nmap.exe' if platform.system() == 'Windows' else 'nmap'
+        """检查Nmap是否安装并检测系统平台(结果按二进制文件缓存, 只探测一次)"""
+        if self.nmap_caps is not None:
+            return self.nmap_caps
+        
+        import subprocess
+        from nmap_probe import probe_nmap, NmapNotFoundError
         
         try:
-            result = subprocess.run([nmap_cmd, '--version'], 
-                                  capture_output=True, text=True, timeout=5,
-                                  encoding='utf-8', errors='ignore')
-            if result.returncode == 0:
-                version_line = result.stdout.split('\n')[0]
-                self.nmap_version = version_line
-                print(f"[+] {version_line}")
-                print(f"[+] 系统平台: {platform.system()} {platform.release()}")
-            else:
-                raise FileNotFoundError
-        except FileNotFoundError:
+            caps = probe_nmap(refresh=self.refresh_nmap_cache)
+            self.nmap_caps = caps
+            self.nmap_path = caps['path']
+            self.nmap_version = caps['version_line']
+            print(f"[+] {self.nmap_version}{' (缓存)' if caps['cached'] else ''}")
+            print(f"[+] 系统平台: {platform.system()} {platform.release()}")
+        except NmapNotFoundError:
             print(f"[!] 错误: 未检测到Nmap,请先安装Nmap")
             print(f"[!] 下载地址: https://nmap.org/download.html")
             if platform.system() == 'Windows':
@@ -112,28 +206,78 @@ class NmapScanner:
         except Exception as e:
             print(f"[!] 检查Nmap时发生错误: {e}")
             sys.exit(1)
+        
+        # 需要原始套接字的选项在非特权模式下会失败或被Nmap降级
+        if not caps['privileged']:
+            if self.scan_type == 'stealth':
+                print("[!] 警告: 当前非root/管理员权限, SYN扫描(stealth)将不可用")
+            if self.os_detect or self.aggressive:
+                print("[!] 警告: 当前非root/管理员权限, OS识别(-O/-A)可能失败")
+            if self.udp_scan:
+                print("[!] 警告: 当前非root/管理员权限, UDP扫描(-sU)将不可用")
+        
+        return caps
     
-    def load_targets(self):
-        """从文件加载目标列表"""
-        targets = []
+    def iter_targets(self):
+        """
+        惰性读取目标(文件/gzip文件/标准输入'-'), 边读边跳过注释并校验格式
+        :return: 目标生成器
+        """
+        from target_source import iter_targets
+        
+        def on_invalid(lineno, line):
+            self.invalid_targets += 1
+            print(f"[!] 忽略非法目标(第{lineno}行): {line}")
+        
         try:
-            with open(self.targets_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#'):
-                        targets.append(line)
+            yield from iter_targets(self.targets_file, on_invalid)
         except FileNotFoundError:
             print(f"[!] 错误: 找不到目标文件 '{self.targets_file}'")
             sys.exit(1)
         except Exception as e:
             print(f"[!] 读取目标文件时出错: {e}")
             sys.exit(1)
+    
+    def load_targets(self):
+        """从文件加载目标列表(一次性读入内存, 大规模目标请使用 iter_targets)"""
+        return list(self.iter_targets())
+    
+    def build_nmap_command(self, target, protocol='tcp', ports=None, stage=None):
+        """
+        构建Nmap扫描命令
+        :param target: 单个目标, 或一批主机(列表, 由Nmap以随机顺序扫描)
+        :param protocol: 'tcp' 或 'udp'(UDP通道只做端口和服务探测, 使用独立的端口、重传和速率设置)
+        :param ports: 覆盖端口参数(端口分片时使用)
+        :param stage: 端口分片的阶段, 'discovery' 只做端口发现, 'detect' 只对已知开放端口做服务识别
+        """
+        cmd = [self.nmap_path or 'nmap']
+        
+        if protocol == 'udp':
+            cmd.extend(self._udp_options())
+        else:
+            cmd.extend(self._tcp_options(ports, stage))
+        
+        # 输出格式(XML格式便于解析)
+        import tempfile
+        temp_xml = tempfile.NamedTemporaryFile(mode='w', suffix='.xml', delete=False)
+        temp_xml.close()
+        cmd.extend(['-oX', temp_xml.name])
+        
+        # 禁用DNS解析加速扫描
+        cmd.append('-n')
         
-        return targets
+        # 目标
+        if isinstance(target, list):
+            cmd.append('--randomize-hosts')
+            cmd.extend(target)
+        else:
+            cmd.append(target)
+        
+        return cmd, temp_xml.name
     
-    def build_nmap_command(self, target):
-        """构建Nmap扫描命令"""
-        cmd = ['nmap']
+    def _tcp_options(self, ports=None, stage=None):
+        """TCP扫描选项(参数含义见 build_nmap_command)"""
+        cmd = []
         
         # 扫描类型
         if self.scan_type == 'quick':
@@ -147,8 +291,13 @@ class NmapScanner:
         else:
             cmd.append('-T4')  # 默认快速扫描
         
+        if stage == 'detect' and self.scan_type != 'full':
+            cmd.append('-Pn')  # 主机已确认存活
+        
         # 激进模式(包含OS检测、版本检测、脚本扫描、traceroute)
-        if self.aggressive:
+        if stage == 'discovery':
+            pass
+        elif self.aggressive:
             cmd.append('-A')
         else:
             # 服务版本探测
@@ -164,28 +313,46 @@ class NmapScanner:
                 cmd.append('-sC')
         
         # 端口范围
-        if self.ports:
+        if ports:
+            cmd.extend(['-p', ports])
+        elif self.ports:
             cmd.extend(['-p', self.ports])
         else:
             # 扫描常见端口
-            common_ports_str = ','.join(map(str, sorted(COMMON_PORTS.keys())))
-            cmd.extend(['-p', common_ports_str])
+            cmd.extend(['-p', COMMON_PORTS_ARG])
         
-        # 输出格式(XML格式便于解析)
-        temp_xml = tempfile.NamedTemporaryFile(mode='w', suffix='.xml', delete=False)
-        temp_xml.close()
-        cmd.extend(['-oX', temp_xml.name])
+        return cmd
+    
+    def _udp_options(self):
+        """UDP扫描选项: 只做端口和服务探测, 重传和速率单独控制"""
+        cmd = ['-sU']
         
-        # 禁用DNS解析加速扫描
-        cmd.append('-n')
+        if self.scan_type == 'full':
+            cmd.extend(['-T3', '-Pn'])
+        elif self.scan_type == 'stealth':
+            cmd.append('-T2')
+        else:
+            cmd.append('-T4')
         
-        # 目标
-        cmd.append(target)
+        if self.service_detect or self.aggressive:
+            cmd.append('-sV')
         
-        return cmd, temp_xml.name
+        # 无响应的UDP端口会被反复重传, 限制重传次数是UDP扫描提速的关键
+        cmd.extend(['--max-retries', str(self.udp_retries)])
+        if self.udp_rate:
+            cmd.extend(['--max-rate', str(self.udp_rate)])
+        
+        cmd.extend(['-p', self.udp_ports or TOP_UDP_PORTS_ARG])
+        
+        return cmd
     
     def parse_nmap_xml(self, xml_file):
-        """解析Nmap XML输出"""
+        """
+        解析Nmap XML输出
+        :return: {ip: HostRecord}, 解析失败时返回None(与"没有存活主机"区分)
+        """
+        import xml.etree.ElementTree as ET
+        
         try:
             tree = ET.parse(xml_file)
             root = tree.getroot()
@@ -215,10 +382,7 @@ class NmapScanner:
                 os_info = None
                 os_match = host.find('.//osmatch')
                 if os_match is not None:
-                    os_info = {
-                        'name': os_match.get('name'),
-                        'accuracy': os_match.get('accuracy')
-                    }
+                    os_info = make_os_info(os_match.get('name'), os_match.get('accuracy'))
                 
                 # 获取端口信息
                 ports_data = []
@@ -255,107 +419,426 @@ class NmapScanner:
                                 'output': script_output
                             })
                         
-                        ports_data.append({
-                            'port': int(port_id),
-                            'protocol': protocol,
-                            'service': service_name,
-                            'product': service_product,
-                            'version': service_version,
-                            'extra': service_extra,
-                            'scripts': scripts
-                        })
+                        ports_data.append(PortRecord(
+                            port_id, protocol, service_name, service_product,
+                            service_version, service_extra, scripts
+                        ))
                 
                 if ports_data:
-                    host_results[ip] = {
-                        'hostnames': hostnames,
-                        'os': os_info,
-                        'ports': sorted(ports_data, key=lambda x: x['port'])
-                    }
+                    ports_data.sort(key=lambda x: x.port)
+                    host_results[ip] = HostRecord(hostnames, os_info, ports_data)
             
             return host_results
             
         except Exception as e:
             print(f"[!] 解析XML文件出错: {e}")
-            return {}
+            return None
     
-    def scan(self):
-        """执行扫描"""
-        print("[*] 正在加载目标...")
-        targets = self.load_targets()
+    def scan_target(self, target, protocol='tcp'):
+        """
+        扫描单个目标
+        :param target: 目标(IP/CIDR/域名), 或一批主机(列表)
+        :param protocol: 'tcp' 或 'udp'
+        :return: parse_nmap_xml() 格式的结果字典, 扫描失败时返回None(见 _run_nmap)
+        """
+        if protocol == 'tcp' and self.port_shards > 1:
+            chunks = self._tcp_port_chunks()
+            if len(chunks) > 1:
+                return self._scan_sharded(target, chunks)
+        return self._run_nmap(target, protocol)
+    
+    def _run_nmap(self, target, protocol='tcp', ports=None, stage=None):
+        """
+        运行一次Nmap并解析结果(参数含义见 build_nmap_command)
+        :return: parse_nmap_xml() 格式的结果字典; Nmap执行失败、非零退出或结果无法解析时返回None,
+                 调用方据此跳过结果(不能当作"没有存活主机"处理, 否则历史与监控会误判主机消失)
+        """
+        # 构建Nmap命令
+        cmd, xml_file = self.build_nmap_command(target, protocol, ports, stage)
+        target = _target_label(target)
         
-        if not targets:
-            print("[!] 没有有效的目标需要扫描")
+        if not self.concurrent:
+            print(f"[*] 执行命令: {' '.join(cmd)}")
+        
+        import subprocess
+        
+        try:
+            # 执行Nmap扫描
+            process = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                bufsize=1,
+                universal_newlines=True,
+                encoding='utf-8',
+                errors='ignore'
+            )
+            
+            # 实时输出进度(并行扫描时各进程输出会交错, 只保留汇总信息)
+            for line in process.stdout:
+                line = line.strip()
+                if line and not self.concurrent:
+                    print(f"    {line}")
+            
+            process.wait()
+            
+            # 解析结果
+            if process.returncode != 0:
+                print(f"[!] 扫描 {target} 时出错(退出码 {process.returncode})")
+                return None
+            with self.phase('parse', snapshot=False):
+                return self.parse_nmap_xml(xml_file)
+                
+        except Exception as e:
+            print(f"[!] 扫描 {target} 时发生异常: {e}")
+            return None
+        finally:
+            # 清理临时文件
+            try:
+                os.unlink(xml_file)
+            except:
+                pass
+    
+    def _tcp_port_chunks(self):
+        """TCP端口分片(只计算一次); 端口参数无法展开时不分片"""
+        if self._port_chunks is None:
+            from port_shards import parse_port_spec, split_ports
+            
+            ports = parse_port_spec(self.ports) if self.ports else sorted(COMMON_PORTS)
+            if ports is None:
+                print(f"[!] 警告: 端口参数 '{self.ports}' 无法按范围分片, 不使用端口分片")
+                self._port_chunks = []
+            else:
+                self._port_chunks = split_ports(ports, self.port_shards)
+        return self._port_chunks
+    
+    def _scan_sharded(self, target, chunks):
+        """
+        端口分片扫描: 各端口段并行做端口发现, 再按主机对发现的开放端口做一次服务识别
+        :return: parse_nmap_xml() 格式的结果字典; 任一分片失败时返回None(部分结果不完整, 不能当作扫描结果)
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        from port_shards import format_ports
+        
+        detect = self.service_detect or self.os_detect or self.script_scan or self.aggressive
+        with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+            shard_results = list(pool.map(
+                lambda ports: self._run_nmap(target, 'tcp', ports, 'discovery'), chunks))
+            if any(results is None for results in shard_results):
+                return None
+            
+            merged = {}
+            for results in shard_results:
+                for ip, data in results.items():
+                    known = merged.get(ip)
+                    merged[ip] = data if known is None else merge_hosts(known, data)
+            if not detect or not merged:
+                return merged
+            
+            # 每个主机一次服务识别, 只探测该主机已发现的开放端口
+            ips = list(merged)
+            detected = pool.map(
+                lambda ip: self._run_nmap(ip, 'tcp', format_ports(p['port'] for p in merged[ip]['ports']),
+                                          'detect'), ips)
+            for ip, results in zip(ips, detected):
+                if results and ip in results:
+                    merged[ip] = results[ip]
+        return merged
+    
+    def handle_results(self, target, results, protocol='tcp', known=()):
+        """
+        处理单个目标的扫描结果: 汇总、更新端口索引、发布到结果输出管道
+        :param target: 目标
+        :param results: parse_nmap_xml() 格式的结果字典
+        :param protocol: 结果所属通道; UDP通道的结果在该任务的TCP结果发布之后到达,
+                         合并到已有主机并作为补充记录发布(见 sinks.py)
+        :param known: 同一任务TCP通道已发现的主机, 不保留结果时用于UDP结果的存活主机计数
+        """
+        lane = 'UDP' if protocol == 'udp' else ''
+        if not results:
+            print(f"[!] {target} - 未发现开放{lane}端口")
+            return
+        
+        self._attach_aliases(results)
+        for ip, data in results.items():
+            print(f"[+] {ip} - 发现 {len(data['ports'])} 个开放{lane}端口")
+        
+        if self.keep_results:
+            self.alive_hosts += sum(1 for ip in results if ip not in self.results)
+        else:
+            # 不保留结果时不记录见过哪些主机, 目标不重叠时计数准确
+            self.alive_hosts += sum(1 for ip in results if ip not in known)
+        self.total_ports += sum(len(data['ports']) for data in results.values())
+        if self.port_index is not None:
+            self.port_index.update(results)
+        
+        if self.sinks is not None:
+            self.sinks.publish(results, update=protocol == 'udp')
+        
+        if self.keep_results:
+            for ip, data in results.items():
+                known = self.results.get(ip)
+                self.results[ip] = data if known is None else merge_hosts(known, data)
+    
+    def _attach_aliases(self, results):
+        """附加预解析得到的域名(扫描时使用 -n, Nmap不会反查)"""
+        if self.resolver is None:
+            return
+        for ip, data in results.items():
+            names = self.host_aliases.get(ip, ())
+            if names:
+                results[ip] = merge_hosts(data, HostRecord(names))
+            # 之后才读到的同IP域名由 _publish_late_aliases 补充
+            self._alias_counts[ip] = len(names)
+    
+    def _publish_late_aliases(self):
+        """结果发布之后才读到的同IP域名: 补充到报告结果, 并作为补充记录输出"""
+        late = {}
+        for ip, count in self._alias_counts.items():
+            names = self.host_aliases.get(ip, ())
+            if len(names) > count:
+                late[ip] = HostRecord(names[count:])
+        if not late:
             return
+        if self.keep_results:
+            for ip, data in late.items():
+                if ip in self.results:
+                    self.results[ip] = merge_hosts(self.results[ip], data)
+        if self.sinks is not None:
+            self.sinks.publish(late, update=True)
+    
+    def close_sinks(self):
+        """等待结果输出处理完毕并关闭"""
+        if self.sinks is not None:
+            self.sinks.close()
+    
+    def scan(self):
+        """执行扫描"""
+        self.check_nmap()
         
-        print(f"[*] 共需扫描 {len(targets)} 个目标")
+        source = '标准输入' if self.targets_file == '-' else self.targets_file
+        print(f"[*] 流式读取目标: {source}")
         print(f"[*] 扫描类型: {self.scan_type}")
         print(f"[*] 服务识别: {'开启' if self.service_detect else '关闭'}")
         print(f"[*] OS识别: {'开启' if self.os_detect else '关闭'}")
         print(f"[*] 脚本扫描: {'开启' if self.script_scan else '关闭'}")
+        order_names = {'file': '文件顺序', 'interleave': '跨网段交错', 'priority': '按历史优先级'}
+        print(f"[*] 目标顺序: {order_names[self.order]}"
+              + (f", 每批 {self.batch_hosts} 个主机" if self.batch_hosts else '')
+              + (f", 并行 {self.parallel} 个进程" if self.parallel > 1 else ''))
+        if self.udp_scan:
+            print(f"[*] UDP扫描: 开启(独立通道, {self.udp_parallel} 个进程, "
+                  f"重传 {self.udp_retries} 次"
+                  + (f", 速率上限 {self.udp_rate} 包/秒" if self.udp_rate else '') + ")")
         print("-" * 60)
         
         self.start_time = datetime.now()
         
-        for idx, target in enumerate(targets, 1):
-            print(f"\n[*] [{idx}/{len(targets)}] 正在扫描目标: {target}")
-            
-            # 构建Nmap命令
-            cmd, xml_file = self.build_nmap_command(target)
-            
-            print(f"[*] 执行命令: {' '.join(cmd)}")
-            
-            try:
-                # 执行Nmap扫描
-                process = subprocess.Popen(
-                    cmd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    bufsize=1,
-                    universal_newlines=True,
-                    encoding='utf-8',
-                    errors='ignore'
-                )
-                
-                # 实时输出进度
-                for line in process.stdout:
-                    line = line.strip()
-                    if line:
-                        print(f"    {line}")
-                
-                process.wait()
+        if self.sinks is not None:
+            self.sinks.open()
+        
+        from ordering import order_targets
+        
+        if self.order == 'priority':
+            from history import ScanHistory
+            self.history = ScanHistory(self.history_file)
+            print(f"[*] 扫描历史: {self.history_file} ({len(self.history.targets)} 个已知目标)")
+        
+        targets = self.iter_targets()
+        if self.resolver is not None:
+            from resolver import resolve_targets
+            targets = resolve_targets(targets, self.resolver, self.host_aliases)
+        
+        # 目标边读边扫, 总数事先未知
+        tasks = order_targets(targets, self.order, self.batch_hosts, history=self.history)
+        with self.phase('scan'):
+            if self.concurrent:
+                idx = self._scan_lanes(tasks)
+            else:
+                idx = 0
+                for idx, target in enumerate(tasks, 1):
+                    print(f"\n[*] [{idx}] 正在扫描目标: {_target_label(target)}")
+                    self._finish_task(target, self.scan_target(target))
+        
+        if self.resolver is not None:
+            self._publish_late_aliases()
+        self.close_sinks()
+        if self.history is not None:
+            self.history.save()
+        
+        if idx == 0:
+            print("[!] 没有有效的目标需要扫描")
+        
+        self.end_time = datetime.now()
+        
+        print("\n" + "=" * 60)
+        if self.resolver is not None:
+            print(f"[*] 域名解析: {self.resolver.lookups} 次查询, {self.resolver.cache_hits} 次缓存命中, "
+                  f"{sum(len(names) for names in self.host_aliases.values())} 个域名合并为 "
+                  f"{len(self.host_aliases)} 个IP")
+        print(f"[*] 扫描完成! 共扫描 {self.total_scanned} 个目标"
+              + (f", 忽略 {self.invalid_targets} 个非法目标" if self.invalid_targets else ''))
+        print(f"[*] 发现 {self.alive_hosts} 个存活主机, {self.total_ports} 个开放端口")
+        print(f"[*] 耗时: {(self.end_time - self.start_time).total_seconds():.2f} 秒")
+    
+    def _finish_task(self, target, results):
+        """汇总一个扫描任务(单个目标或一批主机)的TCP结果"""
+        if results is None:
+            return
+        self.handle_results(_target_label(target), results)
+        # 历史按目标整体替换, 只记录TCP通道结果
+        if self.history is not None:
+            self._record_history(target, results)
+        self.total_scanned += len(target) if isinstance(target, list) else 1
+    
+    def _finish_udp(self, target, tcp_hosts, udp_results):
+        """
+        汇总UDP通道完成的任务: 合并到已发布的主机结果(HTML报告), 并作为补充记录输出
+        :param tcp_hosts: 该任务TCP通道发现的主机IP列表(TCP扫描失败时为None)
+        """
+        if udp_results is None:
+            return
+        self.handle_results(_target_label(target), udp_results, 'udp', set(tcp_hosts or ()))
+    
+    def _record_history(self, target, results):
+        """记录任务结果到扫描历史, 并提示高风险服务"""
+        from priority import RISKY_PORTS, split_results
+        
+        if isinstance(target, list):
+            for single, single_results in split_results(target, results).items():
+                self.history.record(single, single_results)
+        else:
+            self.history.record(target, results)
+        
+        for ip, data in results.items():
+            risky = [f"{p['port']}/{RISKY_PORTS[p['port']]}" for p in data['ports']
+                     if p['protocol'] == 'tcp' and p['port'] in RISKY_PORTS]
+            if risky:
+                print(f"[!] {ip} - 高风险服务: {', '.join(risky)}")
+    
+    def _scan_lanes(self, tasks):
+        """
+        并行扫描: TCP通道最多 parallel 个Nmap进程, UDP通道(开启时)最多 udp_parallel 个,
+        结果在主线程中汇总; 目标仍按需读取
+        
+        每个任务的TCP结果完成后立即发布, 随后该任务进入UDP通道, UDP结果到达后合并到已有主机;
+        UDP通道处理较早的任务时TCP通道继续扫描新目标, 不受UDP速度限制,
+        UDP积压超过 LANE_BACKLOG_LIMIT 的部分暂存到临时文件, 内存占用有界
+        :return: 已读取的任务数
+        """
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+        from spill_queue import SpillQueue
+        
+        udp_backlog = SpillQueue(LANE_BACKLOG_LIMIT)  # [目标, TCP发现的主机]
+        lanes = {'tcp': self.parallel}
+        if self.udp_scan:
+            lanes['udp'] = self.udp_parallel
+        running = dict.fromkeys(lanes, 0)
+        pools = {protocol: ThreadPoolExecutor(max_workers=size) for protocol, size in lanes.items()}
+        pending = {}
+        submitted = 0
+        exhausted = False
+        tasks = iter(tasks)
+        try:
+            while True:
+                while not exhausted and running['tcp'] < self.parallel:
+                    target = next(tasks, None)
+                    if target is None:
+                        exhausted = True
+                        break
+                    submitted += 1
+                    print(f"[*] [{submitted}] 正在扫描目标: {_target_label(target)}")
+                    future = pools['tcp'].submit(self.scan_target, target, 'tcp')
+                    pending[future] = ('tcp', target, None)
+                    running['tcp'] += 1
                 
-                # 解析结果
-                if process.returncode == 0:
-                    results = self.parse_nmap_xml(xml_file)
-                    if results:
-                        self.results.update(results)
-                        for ip, data in results.items():
-                            print(f"[+] {ip} - 发现 {len(data['ports'])} 个开放端口")
-                    else:
-                        print(f"[!] {target} - 未发现开放端口")
-                else:
-                    print(f"[!] 扫描 {target} 时出错")
+                while self.udp_scan and running['udp'] < self.udp_parallel and udp_backlog:
+                    target, tcp_hosts = udp_backlog.popleft()
+                    future = pools['udp'].submit(self.scan_target, target, 'udp')
+                    pending[future] = ('udp', target, tcp_hosts)
+                    running['udp'] += 1
                 
-                # 清理临时文件
-                try:
-                    os.unlink(xml_file)
-                except:
-                    pass
-                    
-            except Exception as e:
-                print(f"[!] 扫描 {target} 时发生异常: {e}")
-                continue
-            
-            self.total_scanned += 1
+                if not pending:
+                    return submitted
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    protocol, target, tcp_hosts = pending.pop(future)
+                    running[protocol] -= 1
+                    if protocol == 'udp':
+                        self._finish_udp(target, tcp_hosts, future.result())
+                        continue
+                    results = future.result()
+                    self._finish_task(target, results)
+                    if self.udp_scan:
+                        udp_backlog.append([target, list(results) if results is not None else None])
+        finally:
+            for pool in pools.values():
+                pool.shutdown(wait=True)
+            udp_backlog.close()
+            if udp_backlog.spilled_total:
+                print(f"[*] UDP通道积压超过 {LANE_BACKLOG_LIMIT} 个任务, "
+                      f"共 {udp_backlog.spilled_total} 个任务曾暂存到临时文件")
+    
+    def scan_distributed(self, address, shard_size=1, max_retries=3, token=None):
+        """
+        以协调者身份执行分布式扫描: 目标分片下发给各工作节点, 汇总结果
+        :param address: 监听地址 HOST:PORT
+        :param shard_size: 每个分片的目标数
+        :param max_retries: 节点断开后分片的最大重试次数
+        :param token: 工作节点连接口令
+        """
+        from distributed import Coordinator
+        
+        print("[*] 正在加载目标...")
+        targets = self.load_targets()
+        
+        if not targets:
+            print("[!] 没有有效的目标需要扫描")
+            return
+        
+        print(f"[*] 共需扫描 {len(targets)} 个目标, 分布式模式(每片 {shard_size} 个目标)")
+        print("-" * 60)
+        
+        self.start_time = datetime.now()
+        
+        if self.sinks is not None:
+            self.sinks.open()
+        
+        def on_results(shard_targets, results, scanned):
+            self.handle_results(', '.join(shard_targets), results)
+            self.total_scanned += scanned
+        
+        coordinator = Coordinator(targets, address, shard_size=shard_size,
+                                  max_retries=max_retries, token=token,
+                                  on_results=on_results)
+        coordinator.run()
+        
+        self.nmap_version = self.nmap_version or next(iter(coordinator.nmap_versions), None)
+        
+        self.close_sinks()
         
         self.end_time = datetime.now()
         
         print("\n" + "=" * 60)
-        print(f"[*] 扫描完成!")
-        print(f"[*] 发现 {len(self.results)} 个存活主机")
+        print(f"[*] 分布式扫描完成!")
+        print(f"[*] 发现 {self.alive_hosts} 个存活主机, {self.total_ports} 个开放端口")
         print(f"[*] 耗时: {(self.end_time - self.start_time).total_seconds():.2f} 秒")
     
+    def serve_as_worker(self, address, token=None, name=None):
+        """
+        以工作节点身份连接协调者, 循环领取分片并扫描
+        :param address: 协调者地址 HOST:PORT
+        :param token: 连接口令
+        :param name: 节点名称
+        """
+        from distributed import run_worker
+        
+        self.check_nmap()
+        print(f"[*] 工作节点模式, 协调者: {address}")
+        return run_worker(address, self.scan_target, name=name, token=token,
+                          nmap_version=self.nmap_version)
+    
     def generate_html_report(self):
         """生成HTML格式报告"""
         scan_info = {
@@ -365,8 +848,92 @@ class NmapScanner:
             'nmap_version': self.nmap_version
         }
         
-        report_generator = HTMLReportGenerator(self.results, scan_info)
-        report_generator.generate(self.output_file)
+        from html_report import HTMLReportGenerator
+        
+        fragment_cache = None
+        if self.report_cache:
+            from fragment_cache import FragmentCache
+            fragment_cache = FragmentCache(
+                self.report_cache, HTMLReportGenerator.fragment_version(self.compact_report))
+        
+        with self.phase('report'):
+            report_generator = HTMLReportGenerator(self.results, scan_info, phase=self.phase,
+                                                   fragment_cache=fragment_cache,
+                                                   compact=self.compact_report)
+            report_generator.generate(self.output_file)
+
+
+def _target_label(target):
+    """任务显示名称(一批主机时只列出前几个)"""
+    if not isinstance(target, list):
+        return target
+    if len(target) <= 4:
+        return ', '.join(target)
+    return f"{', '.join(target[:3])} 等 {len(target)} 个主机"
+
+
+def learn_profile(args):
+    """从扫描历史学习端口配置"""
+    from port_profiles import PortProfiles
+    
+    try:
+        profile = PortProfiles(args.port_profiles).learn(
+            args.learn_profile, args.history, args.profile_coverage, args.profile_scope)
+    except ValueError as e:
+        print(f"[!] 错误: {e}")
+        sys.exit(1)
+    
+    ports = profile['ports']
+    print(f"[+] 端口配置 {args.learn_profile} 已保存至: {args.port_profiles}")
+    print(f"[*] 历史: {profile['hosts']} 个主机, {profile['segments']} 个网段, "
+          f"{profile['findings']} 个开放端口")
+    print(f"[*] 选取 {len(ports)} 个端口 (常见端口列表 {len(COMMON_PORTS)} 个), "
+          f"平均网段覆盖率 {profile['coverage']:.1%}")
+    print(f"[*] 端口: {','.join(map(str, ports[:30]))}{' ...' if len(ports) > 30 else ''}")
+    print(f"[*] 使用: python main.py -f targets.txt -p profile:{args.learn_profile}")
+
+
+def run_daemon(args):
+    """守护进程模式: 以命令行参数作为任务默认选项"""
+    from daemon import ScanDaemon
+    from distributed import parse_address
+    
+    defaults = {
+        'ports': args.ports,
+        'scan_type': args.scan_type,
+        'service_detect': args.service_version,
+        'os_detect': args.os_detect,
+        'script_scan': args.script_scan,
+        'aggressive': args.aggressive,
+    }
+    
+    def scanner_factory(**options):
+        return NmapScanner(None, refresh_nmap_cache=args.refresh_nmap_cache,
+                           profiles_file=args.port_profiles,
+                           **dict(defaults, **options))
+    
+    daemon = ScanDaemon(scanner_factory, max_processes=args.max_procs)
+    daemon.serve_forever(parse_address(args.daemon, default_host='127.0.0.1'), token=args.token)
+
+
+def run_monitor(scanner, args):
+    """持续监控模式"""
+    from history import ScanHistory
+    from monitor import (Monitor, parse_interval, JSONLinesEventSink,
+                         WebhookEventSink, PrintEventSink)
+    
+    sinks = [PrintEventSink()]
+    if args.events:
+        sinks.append(JSONLinesEventSink(args.events))
+    if args.webhook:
+        sinks.append(WebhookEventSink(args.webhook))
+    
+    # 监控长期运行, 结果不在内存中累积
+    scanner.keep_results = False
+    scanner.check_nmap()
+    monitor = Monitor(scanner, scanner.load_targets(), parse_interval(args.monitor),
+                      ScanHistory(args.history), sinks)
+    monitor.run(cycles=args.cycles)
 
 
 def main():
@@ -404,15 +971,67 @@ def main():
   
   # 隐蔽扫描
   python main.py -f targets.txt --scan-type stealth
+  
+  # 从标准输入或gzip文件读取目标(边读边扫)
+  asset-export | python main.py -f - --jsonl hosts.jsonl --no-html
+  python main.py -f targets.txt.gz
+  
+  # 同时流式导出JSON Lines和CSV(gzip压缩)
+  python main.py -f targets.txt --jsonl hosts.jsonl --csv ports.csv --gzip
+  
+  # 仅导出, 不生成HTML报告(结果不在内存中累积)
+  python main.py -f targets.txt --jsonl hosts.jsonl --no-html
+  
+  # 分布式扫描: 协调者 + 多个工作节点
+  python main.py -f targets.txt --coordinator 0.0.0.0:9700 --token secret
+  python main.py --worker 10.0.0.5:9700 --token secret -sV
+  
+  # 守护进程模式: 通过本地HTTP接口提交任务
+  python main.py --daemon 127.0.0.1:8765 --max-procs 8
+  curl -X POST http://127.0.0.1:8765/jobs -d '{"targets": ["192.168.1.0/24"], "ports": "22,80"}'
+  
+  # 持续监控: 每小时一轮, 变化事件写入JSONL
+  python main.py -f targets.txt --monitor 1h --events changes.jsonl
+  
+  # 8个Nmap进程并行, 目标跨/24网段交错, 每次调用16个主机
+  python main.py -f targets.txt --parallel 8 --order interleave --batch-hosts 16
+  
+  # TCP与UDP通道并行扫描, UDP限速200包/秒
+  python main.py -f targets.txt -sU --udp-rate 200
+  
+  # 少量主机全端口扫描: 端口范围切成8段并行发现, 再对开放端口做服务识别
+  python main.py -f vip.txt -p 1-65535 -sV --port-shards 8
+  
+  # 从扫描历史学习端口配置(覆盖95%的历史发现), 之后按配置扫描
+  python main.py --learn-profile office --history scan_history.json --profile-scope 10.1.0.0/16
+  python main.py -f targets.txt -p profile:office
+  
+  # 周期性扫描: 复用未变化主机的报告片段
+  python main.py -f targets.txt --report-cache report.cache
+  
+  # 归档用紧凑报告(共享资源 + .html.gz)
+  python main.py -f targets.txt -o archive/2024-06-01.html --compact-report
+  
+  # 挂接自定义结果输出(如告警), 与JSONL导出并发消费结果
+  python main.py -f targets.txt --jsonl hosts.jsonl --sink mysinks:AlertSink:https://hooks.example/x
+  
+  # 域名目标并发预解析, 指向同一IP的多个域名只扫描一次
+  python main.py -f domains.txt --resolve --dns-workers 32
+  
+  # 按历史结果排序: 上次开放端口多、有高风险服务、久未扫描的目标先扫
+  python main.py -f targets.txt --order priority --history scan_history.json
+  
+  # 保存端口位图索引, 并与上次扫描比较差异
+  python main.py -f targets.txt --diff-index last.idx.gz --save-index today.idx.gz
         """
     )
     
-    parser.add_argument('-f', '--file', required=True,
-                       help='目标文件路径(支持IP、CIDR、域名)')
+    parser.add_argument('-f', '--file',
+                       help='目标文件路径(支持IP、CIDR、域名; gzip压缩文件; "-"表示标准输入), 工作节点模式下不需要')
     parser.add_argument('-o', '--output', default='scan_report.html',
                        help='输出HTML报告文件名(默认: scan_report.html)')
     parser.add_argument('-p', '--ports',
-                       help='端口范围(如: 80,443 或 1-1000),默认扫描常见端口')
+                       help='端口范围(如: 80,443 或 1-1000 或 profile:名称),默认扫描常见端口')
     parser.add_argument('--scan-type', choices=['default', 'quick', 'full', 'stealth'],
                        default='default', help='扫描类型')
     parser.add_argument('-sV', '--service-version', action='store_true',
@@ -423,28 +1042,216 @@ def main():
                        help='启用默认脚本扫描')
     parser.add_argument('-A', '--aggressive', action='store_true',
                        help='激进模式(包含-sV -O -sC --traceroute)')
+    parser.add_argument('--jsonl', metavar='FILE',
+                       help='流式导出JSON Lines(每个主机一行)')
+    parser.add_argument('--csv', metavar='FILE',
+                       help='流式导出CSV(每个开放端口一行)')
+    parser.add_argument('--gzip', action='store_true',
+                       help='对JSONL/CSV导出文件进行gzip压缩')
+    parser.add_argument('--sink', action='append', default=[], metavar='MODULE:CLASS[:ARG]',
+                       help='挂接自定义结果输出(可多次指定), 如 mysinks:AlertSink:https://hooks.example/x')
+    parser.add_argument('--sink-queue', type=int, default=64, metavar='N',
+                       help='每个结果输出的队列容量, 输出跟不上时扫描等待(默认: 64)')
+    parser.add_argument('--no-html', action='store_true',
+                       help='不生成HTML报告, 结果不在内存中累积(需配合--jsonl/--csv/--sink)')
+    parser.add_argument('--save-index', metavar='FILE',
+                       help='保存开放端口位图索引(用于后续查询和差异比较)')
+    parser.add_argument('--diff-index', metavar='FILE',
+                       help='与之前保存的端口索引比较, 输出变化')
+    parser.add_argument('--refresh-nmap-cache', action='store_true',
+                       help='忽略缓存, 重新探测Nmap版本与能力')
+    parser.add_argument('--coordinator', metavar='HOST:PORT',
+                       help='分布式模式: 作为协调者监听, 将目标分片下发给工作节点'
+                            '(只写端口时监听127.0.0.1, 监听其他地址需设置--token)')
+    parser.add_argument('--worker', metavar='HOST:PORT',
+                       help='分布式模式: 作为工作节点连接协调者')
+    parser.add_argument('--shard-size', type=int, default=1,
+                       help='分布式模式下每个分片的目标数(默认: 1)')
+    parser.add_argument('--shard-retries', type=int, default=3,
+                       help='工作节点断开后分片的最大重试次数(默认: 3)')
+    parser.add_argument('--token',
+                       help='分布式模式下工作节点连接口令 / 守护进程模式HTTP接口口令')
+    parser.add_argument('--daemon', nargs='?', const='127.0.0.1:8765', metavar='HOST:PORT',
+                       help='守护进程模式: 常驻并通过本地HTTP/JSON接口接收扫描任务(默认: 127.0.0.1:8765)')
+    parser.add_argument('--max-procs', type=int, default=4,
+                       help='守护进程模式下同时运行的Nmap进程数上限(默认: 4)')
+    parser.add_argument('--monitor', metavar='INTERVAL',
+                       help='持续监控模式: 按周期重复扫描(如 3600 / 30m / 6h), 只输出变化事件')
+    parser.add_argument('--history', default='scan_history.json', metavar='FILE',
+                       help='扫描历史文件, 保存各主机最新状态, 供监控与优先级排序使用(默认: scan_history.json)')
+    parser.add_argument('--events', metavar='FILE',
+                       help='监控模式下变化事件写入的JSON Lines文件')
+    parser.add_argument('--webhook', metavar='URL',
+                       help='监控模式下变化事件以HTTP POST推送的地址')
+    parser.add_argument('--cycles', type=int, default=0,
+                       help='监控模式运行轮数(默认: 0, 一直运行)')
+    parser.add_argument('--parallel', type=int, default=1, metavar='N',
+                       help='同时运行的Nmap进程数(默认: 1)')
+    parser.add_argument('--order', choices=['file', 'interleave', 'priority'], default='file',
+                       help='目标顺序: file 按文件顺序; interleave 按/24网段交错, 分散对同一网段的并发压力; '
+                            'priority 按扫描历史(--history)优先扫描高价值目标')
+    parser.add_argument('--batch-hosts', type=int, default=0, metavar='N',
+                       help='每次Nmap调用扫描N个目标, 附加--randomize-hosts; interleave顺序下网段先展开为主机(默认: 0 不分批)')
+    parser.add_argument('-sU', '--udp', action='store_true',
+                       help='同时进行UDP扫描(独立通道并行运行, 不拖慢TCP结果; 需要root/管理员权限)')
+    parser.add_argument('--udp-ports',
+                       help='UDP端口(默认: 常见UDP端口)')
+    parser.add_argument('--udp-parallel', type=int, default=2, metavar='N',
+                       help='同时运行的UDP扫描进程数(默认: 2)')
+    parser.add_argument('--udp-retries', type=int, default=1, metavar='N',
+                       help='UDP探测最大重传次数(默认: 1)')
+    parser.add_argument('--udp-rate', type=int, metavar='PPS',
+                       help='UDP发包速率上限(包/秒, 默认不限制)')
+    parser.add_argument('--resolve', action='store_true',
+                       help='扫描前并发解析域名目标, 指向同一IP的域名只扫描一次, 域名附加到结果中')
+    parser.add_argument('--dns-workers', type=int, default=16, metavar='N',
+                       help='域名解析线程数(默认: 16)')
+    parser.add_argument('--dns-ttl', type=int, default=300, metavar='SECONDS',
+                       help='域名解析结果缓存秒数(默认: 300)')
+    parser.add_argument('--port-shards', type=int, default=1, metavar='N',
+                       help='把TCP端口范围切成N段并行扫描同一目标, 再对开放端口做一次服务识别(默认: 1 不分片)')
+    parser.add_argument('--port-profiles', default='port_profiles.json', metavar='FILE',
+                       help='端口配置文件(默认: port_profiles.json)')
+    parser.add_argument('--learn-profile', metavar='NAME',
+                       help='从扫描历史(--history)学习端口配置并保存, 之后以 -p profile:NAME 使用')
+    parser.add_argument('--profile-coverage', type=float, default=0.95, metavar='RATIO',
+                       help='端口配置需覆盖的历史发现比例(默认: 0.95)')
+    parser.add_argument('--profile-scope', metavar='CIDR',
+                       help='只从该网段内主机的历史学习端口配置')
+    parser.add_argument('--report-cache', metavar='FILE',
+                       help='HTML报告片段缓存文件, 周期性扫描生成报告时只重新渲染变化的主机')
+    parser.add_argument('--compact-report', action='store_true',
+                       help='紧凑报告: CSS/JS放入共享的report-assets目录, 精简标记, 并输出预压缩的.html.gz')
+    parser.add_argument('--profile', nargs='?', const='profile', metavar='DIR',
+                       help='性能剖析: 用cProfile/tracemalloc分阶段记录, 输出到目录(默认: profile)')
     
     args = parser.parse_args()
     
+    if not args.file and not (args.worker or args.daemon or args.learn_profile):
+        parser.error('需要指定 -f/--file (--worker/--daemon/--learn-profile 模式除外)')
+    if not 0 < args.profile_coverage <= 1:
+        parser.error('--profile-coverage 取值范围为 (0, 1]')
+    
+    if args.learn_profile:
+        learn_profile(args)
+        return
+    if args.coordinator and args.worker:
+        parser.error('--coordinator 与 --worker 不能同时使用')
+    if args.coordinator and not args.token:
+        from distributed import is_loopback, parse_address
+        try:
+            host = parse_address(args.coordinator)[0]
+        except ValueError:
+            parser.error(f'无效的监听地址: {args.coordinator}')
+        if not is_loopback(host):
+            parser.error('--coordinator 监听非本机地址时必须设置 --token')
+    if args.daemon and not args.token:
+        from distributed import is_loopback, parse_address
+        try:
+            host = parse_address(args.daemon)[0]
+        except ValueError:
+            parser.error(f'无效的监听地址: {args.daemon}')
+        if not is_loopback(host):
+            parser.error('--daemon 监听非本机地址时必须设置 --token')
+    if args.no_html and not (args.jsonl or args.csv or args.sink):
+        parser.error('--no-html 需要配合 --jsonl、--csv 或 --sink 使用')
+    if args.sink_queue < 1:
+        parser.error('--sink-queue 必须大于0')
+    
+    exporters = []
+    if args.jsonl or args.csv:
+        from exporters import JSONLinesExporter, CSVExporter
+    if args.jsonl:
+        exporters.append(JSONLinesExporter(args.jsonl, compress=args.gzip))
+    if args.csv:
+        exporters.append(CSVExporter(args.csv, compress=args.gzip))
+    
+    sinks = []
+    if args.sink:
+        from sinks import load_sink
+        try:
+            sinks = [load_sink(spec) for spec in args.sink]
+        except ValueError as e:
+            parser.error(str(e))
+    
+    profiler = None
+    if args.profile:
+        from profiler import PhaseProfiler
+        profiler = PhaseProfiler(args.profile)
+    
+    resolver = None
+    if args.resolve:
+        from resolver import Resolver
+        resolver = Resolver(workers=args.dns_workers, ttl=args.dns_ttl)
+    
     # 创建扫描器实例
-    scanner = NmapScanner(
-        targets_file=args.file,
-        output_file=args.output,
-        ports=args.ports,
-        scan_type=args.scan_type,
-        service_detect=args.service_version,
-        os_detect=args.os_detect,
-        script_scan=args.script_scan,
-        aggressive=args.aggressive
-    )
+    try:
+        scanner = NmapScanner(
+            targets_file=args.file,
+            output_file=args.output,
+            ports=args.ports,
+            scan_type=args.scan_type,
+            service_detect=args.service_version,
+            os_detect=args.os_detect,
+            script_scan=args.script_scan,
+            aggressive=args.aggressive,
+            exporters=exporters,
+            keep_results=not args.no_html,
+            refresh_nmap_cache=args.refresh_nmap_cache,
+            profiler=profiler,
+            parallel=args.parallel,
+            order=args.order,
+            batch_hosts=args.batch_hosts,
+            history_file=args.history,
+            udp_scan=args.udp,
+            udp_ports=args.udp_ports,
+            udp_parallel=args.udp_parallel,
+            udp_retries=args.udp_retries,
+            udp_rate=args.udp_rate,
+            resolver=resolver,
+            port_shards=args.port_shards,
+            profiles_file=args.port_profiles,
+            report_cache=args.report_cache,
+            compact_report=args.compact_report,
+            sinks=sinks,
+            sink_queue=args.sink_queue,
+            build_index=bool(args.save_index or args.diff_index)
+        )
+    except ValueError as e:
+        print(f"[!] 错误: {e}")
+        sys.exit(1)
     
     try:
-        scanner.scan()
-        scanner.generate_html_report()
+        if args.daemon:
+            run_daemon(args)
+            return
+        if args.monitor:
+            run_monitor(scanner, args)
+            return
+        if args.worker:
+            scanner.serve_as_worker(args.worker, token=args.token)
+            return
+        if args.coordinator:
+            scanner.scan_distributed(args.coordinator, shard_size=args.shard_size,
+                                     max_retries=args.shard_retries, token=args.token)
+        else:
+            scanner.scan()
+        if not args.no_html:
+            scanner.generate_html_report()
+        if args.diff_index:
+            from port_index import PortIndex, print_diff
+            print(f"\n[*] 与 {args.diff_index} 比较:")
+            print_diff(PortIndex.load(args.diff_index).diff(scanner.port_index))
+        if args.save_index:
+            scanner.port_index.save(args.save_index)
+            print(f"[+] 端口索引已保存至: {args.save_index}")
         print("\n" + "=" * 60)
         print("[*] 🎉 扫描任务全部完成!")
-        print(f"[*] 📄 报告文件: {os.path.abspath(args.output)}")
-        print(f"[*] 💾 文件大小: {os.path.getsize(args.output) / 1024:.2f} KB")
+        if not args.no_html:
+            print(f"[*] 📄 报告文件: {os.path.abspath(args.output)}")
+            print(f"[*] 💾 文件大小: {os.path.getsize(args.output) / 1024:.2f} KB")
+        for exporter in exporters:
+            print(f"[*] 📤 导出文件: {os.path.abspath(exporter.output_file)}")
         print("=" * 60)
     except KeyboardInterrupt:
         print("\n[!] 用户中断扫描")
@@ -459,6 +1266,12 @@ def main():
             import traceback
             traceback.print_exc()
         sys.exit(1)
+    finally:
+        # 无论如何退出都要写完已入队的结果并关闭导出文件(gzip需要写入结尾)
+        scanner.close_sinks()
+        # 监控/守护/工作节点模式、中断和出错时同样输出剖析数据
+        if profiler is not None:
+            profiler.finish()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+持续监控模式
+按固定周期重复扫描目标, 并把一个周期内的扫描均匀分散到整个周期(而不是整点集中
+爆发), 资源占用保持平稳; 每个目标扫描完成后与历史状态比较, 只输出变化事件:
+
+  host_new         新出现的主机
+  host_gone        之前存在、本次未发现的主机
+  port_opened      新开放的端口
+  port_closed      已关闭的端口
+  service_changed  端口上的服务/产品/版本发生变化
+
+事件写入 JSON Lines 文件, 或以 HTTP POST 推送到 webhook 地址
+
+Author: Security Researcher
+License: MIT
+"""
+
+import json
+import time
+import urllib.request
+from datetime import datetime
+
+
+def parse_interval(text):
+    """解析时间间隔: 3600 / 90s / 30m / 6h / 1d"""
+    text = str(text).strip().lower()
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    if text and text[-1] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+
+def _port_map(host_data):
+    if host_data is None:
+        return {}
+    return {(p['protocol'], p['port']): p for p in host_data['ports']}
+
+
+def diff_host(ip, old, new):
+    """
+    比较同一主机的两次结果
+    :param ip: 主机IP
+    :param old: 上次结果(None表示新主机)
+    :param new: 本次结果(None表示主机消失)
+    :return: 事件列表
+    """
+    if old is None and new is not None:
+        return [{'type': 'host_new', 'ip': ip,
+                 'ports': [f"{p['port']}/{p['protocol']}" for p in new['ports']]}]
+    if new is None:
+        return [{'type': 'host_gone', 'ip': ip}]
+
+    events = []
+    old_ports = _port_map(old)
+    new_ports = _port_map(new)
+    for key in sorted(set(old_ports) | set(new_ports), key=lambda k: (k[0], k[1])):
+        protocol, port = key
+        before = old_ports.get(key)
+        after = new_ports.get(key)
+        if before is None:
+            events.append({'type': 'port_opened', 'ip': ip, 'port': port, 'protocol': protocol,
+                           'service': after['service'], 'product': after['product'],
+                           'version': after['version']})
+        elif after is None:
+            events.append({'type': 'port_closed', 'ip': ip, 'port': port, 'protocol': protocol,
+                           'service': before['service']})
+        else:
+            old_sig = (before['service'], before['product'], before['version'])
+            new_sig = (after['service'], after['product'], after['version'])
+            if old_sig != new_sig:
+                events.append({'type': 'service_changed', 'ip': ip, 'port': port,
+                               'protocol': protocol,
+                               'old': ' '.join(x for x in old_sig if x),
+                               'new': ' '.join(x for x in new_sig if x)})
+    return events
+
+
+class JSONLinesEventSink:
+    """事件写入JSON Lines文件(追加)"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def emit(self, events):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for event in events:
+                f.write(json.dumps(event, ensure_ascii=False) + '\n')
+
+
+class WebhookEventSink:
+    """事件以 HTTP POST (JSON数组) 推送到webhook地址"""
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+
+    def emit(self, events):
+        body = json.dumps(events, ensure_ascii=False).encode('utf-8')
+        request = urllib.request.Request(self.url, data=body, method='POST',
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except Exception as e:
+            print(f"[!] 推送webhook失败: {e}")
+
+
+class PrintEventSink:
+    """事件输出到控制台"""
+
+    def emit(self, events):
+        for event in events:
+            detail = {k: v for k, v in event.items() if k not in ('type', 'time', 'ip', 'target')}
+            print(f"[!] 变化 {event['type']:<16} {event['ip']:<16} {detail or ''}")
+
+
+class Monitor:
+    """持续监控调度器"""
+
+    def __init__(self, scanner, targets, interval, history, sinks, save_every=30):
+        """
+        :param scanner: NmapScanner 实例(使用其 scan_target())
+        :param targets: 目标列表
+        :param interval: 每轮扫描周期(秒), 一轮内的目标均匀分布在周期中
+        :param history: ScanHistory 实例, 保存每个主机的最新状态
+        :param sinks: 事件输出列表(具有 emit(events) 方法)
+        :param save_every: 历史文件最短保存间隔(秒)
+        """
+        self.scanner = scanner
+        self.targets = list(targets)
+        self.interval = interval
+        self.history = history
+        self.sinks = sinks
+        self.save_every = save_every
+        self._last_save = time.monotonic()
+        self.events_emitted = 0
+
+    def check_target(self, target):
+        """扫描单个目标并与历史比较, 返回变化事件列表"""
+        results = self.scanner.scan_target(target)
+        if results is None:
+            return []
+
+        baseline = self.history.target(target) is None
+        events = []
+        for ip, host_data in results.items():
+            events.extend(diff_host(ip, self.history.host(ip), host_data))
+        previous = self.history.record(target, results)
+        for ip in previous:
+            if ip not in results:
+                events.extend(diff_host(ip, {}, None))
+
+        # 首次扫描的目标只建立基线, 不产生告警
+        if baseline:
+            return []
+
+        now = datetime.now().isoformat(timespec='seconds')
+        for event in events:
+            event['time'] = now
+            event['target'] = target
+        return events
+
+    def _emit(self, events):
+        if not events:
+            return
+        self.events_emitted += len(events)
+        for sink in self.sinks:
+            sink.emit(events)
+
+    def _maybe_save(self, force=False):
+        if self.history.dirty and (force or time.monotonic() - self._last_save >= self.save_every):
+            self.history.save()
+            self._last_save = time.monotonic()
+
+    def run(self, cycles=0):
+        """
+        运行监控
+        :param cycles: 运行轮数, 0表示一直运行
+        """
+        if not self.targets:
+            print("[!] 没有有效的目标需要监控")
+            return
+
+        slot = self.interval / len(self.targets)
+        print(f"[*] 监控 {len(self.targets)} 个目标, 周期 {self.interval:.0f} 秒, "
+              f"每 {slot:.1f} 秒启动一个目标")
+        cycle = 0
+        try:
+            while not cycles or cycle < cycles:
+                cycle += 1
+                cycle_start = time.monotonic()
+                print(f"\n[*] 第 {cycle} 轮监控开始")
+                for idx, target in enumerate(self.targets):
+                    # 按时间槽均匀启动; 若前一个目标超时占用, 不补偿突发
+                    delay = cycle_start + idx * slot - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    self._emit(self.check_target(target))
+                    self._maybe_save()
+                self._maybe_save(force=True)
+                remaining = cycle_start + self.interval - time.monotonic()
+                if remaining > 0 and (not cycles or cycle < cycles):
+                    time.sleep(remaining)
+        finally:
+            self._maybe_save(force=True)
+            print(f"[*] 监控结束, 共输出 {self.events_emitted} 个变化事件")
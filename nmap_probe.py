@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Nmap能力探测与缓存
+`nmap --version` 的结果(版本、编译特性)按可执行文件的 路径 + mtime + 大小 缓存到
+用户缓存目录, 二进制文件未变化时无需再启动子进程; 当前进程是否具备原始套接字
+权限每次实时判断(开销极小), 据此得出可用的扫描类型
+
+Author: Security Researcher
+License: MIT
+"""
+
+import json
+import os
+import platform
+import shutil
+import subprocess
+
+CACHE_FORMAT_VERSION = 1
+
+# 需要原始套接字权限(root/管理员)的扫描类型
+PRIVILEGED_SCAN_TYPES = ('syn', 'udp', 'os')
+UNPRIVILEGED_SCAN_TYPES = ('connect',)
+
+
+class NmapNotFoundError(Exception):
+    """未找到可用的Nmap"""
+
+
+def default_cache_file():
+    """返回缓存文件路径(遵循 XDG_CACHE_HOME / LOCALAPPDATA)"""
+    if platform.system() == 'Windows':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'nmap-scanner', 'nmap_probe.json')
+
+
+def find_nmap():
+    """在PATH中查找Nmap可执行文件, 返回绝对路径或None"""
+    nmap_cmd = 'nmap.exe' if platform.system() == 'Windows' else 'nmap'
+    path = shutil.which(nmap_cmd)
+    return os.path.realpath(path) if path else None
+
+
+def is_privileged():
+    """当前进程是否可以使用原始套接字扫描"""
+    if os.environ.get('NMAP_PRIVILEGED'):
+        return True
+    if hasattr(os, 'geteuid'):
+        return os.geteuid() == 0
+    # Windows: 检查管理员权限
+    try:
+        import ctypes
+        return bool(ctypes.windll.shell32.IsUserAnAdmin())
+    except Exception:
+        return False
+
+
+def _parse_version_output(output):
+    """解析 `nmap --version` 输出"""
+    lines = output.splitlines()
+    info = {
+        'version_line': lines[0].strip() if lines else 'Nmap',
+        'version': '',
+        'compiled_with': [],
+    }
+    parts = info['version_line'].split()
+    if len(parts) >= 3 and parts[1] == 'version':
+        info['version'] = parts[2]
+    for line in lines[1:]:
+        if line.startswith('Compiled with:'):
+            info['compiled_with'] = line.split(':', 1)[1].split()
+    return info
+
+
+def _load_cache(cache_file):
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('format') == CACHE_FORMAT_VERSION:
+            return data
+    except (OSError, ValueError):
+        pass
+    return {'format': CACHE_FORMAT_VERSION, 'binaries': {}}
+
+
+def _save_cache(cache_file, data):
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        tmp_file = cache_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        # 缓存写入失败不影响扫描
+        pass
+
+
+def probe_nmap(nmap_path=None, cache_file=None, refresh=False, timeout=5):
+    """
+    探测Nmap版本与能力
+    :param nmap_path: Nmap可执行文件路径, None表示在PATH中查找
+    :param cache_file: 缓存文件路径, None表示默认位置
+    :param refresh: 忽略缓存重新探测
+    :param timeout: `nmap --version` 超时秒数
+    :return: 能力字典 {path, version_line, version, compiled_with, cached,
+             privileged, scan_types}
+    :raises NmapNotFoundError: 未找到Nmap或无法执行
+    :raises subprocess.TimeoutExpired: 探测超时
+    """
+    nmap_path = nmap_path or find_nmap()
+    if not nmap_path:
+        raise NmapNotFoundError('nmap not found in PATH')
+
+    try:
+        stat = os.stat(nmap_path)
+    except OSError:
+        raise NmapNotFoundError(nmap_path)
+    cache_file = cache_file or default_cache_file()
+    fingerprint = [stat.st_mtime, stat.st_size]
+
+    cache = _load_cache(cache_file)
+    entry = cache['binaries'].get(nmap_path)
+    cached = entry is not None and entry.get('fingerprint') == fingerprint and not refresh
+
+    if not cached:
+        try:
+            result = subprocess.run([nmap_path, '--version'],
+                                    capture_output=True, text=True, timeout=timeout,
+                                    encoding='utf-8', errors='ignore')
+        except FileNotFoundError:
+            raise NmapNotFoundError(nmap_path)
+        if result.returncode != 0:
+            raise NmapNotFoundError(nmap_path)
+        entry = _parse_version_output(result.stdout)
+        entry['fingerprint'] = fingerprint
+        cache['binaries'][nmap_path] = entry
+        _save_cache(cache_file, cache)
+
+    privileged = is_privileged()
+    capabilities = dict(entry)
+    capabilities.pop('fingerprint', None)
+    capabilities.update({
+        'path': nmap_path,
+        'cached': cached,
+        'privileged': privileged,
+        'scan_types': list(UNPRIVILEGED_SCAN_TYPES + (PRIVILEGED_SCAN_TYPES if privileged else ())),
+    })
+    return capabilities
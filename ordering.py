@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+目标排序: 跨网段交错
+目标文件通常按网段顺序排列(整个 /24 之后是下一个 /24), 顺序扫描时所有探测包同时
+压在同一台路由器/防火墙/限速设备上; 交错排序按 /24 分桶后轮流从各桶取目标,
+使并行的Nmap进程同时落在不同的网络路径上
+
+- 不分批: 大于 /24 的网段切成 /24 块, 以 /24 块和单个目标为单位交错
+- 分批(batch_size>0): 网段展开为单个地址(与Nmap一样包含网络/广播地址)后交错,
+  每 batch_size 个主机组成一次Nmap调用, 同一批内的主机分属不同网段, 配合 Nmap 的 --randomize-hosts 使用
+- 每个网段最多切成 MAX_CHUNKS 块(更大的网段相应切成更大的块); IPv6网段不展开也不切块, 整体交给Nmap
+
+输入按窗口(window个目标)读取后在窗口内交错, 保持流式读取时内存有界
+
+Author: Security Researcher
+License: MIT
+"""
+
+import ipaddress
+from collections import OrderedDict, deque
+from itertools import islice
+
+from target_source import batched
+
+# 单个目标展开为主机时的上限, 更大的网段按 /24 块交错, 避免一次性生成海量主机
+MAX_EXPAND_PREFIX = 16
+# 单个网段最多切成的块数, 避免 /8 等大网段生成海量块
+MAX_CHUNKS = 256
+
+
+def _parse_network(target):
+    try:
+        return ipaddress.ip_network(target, strict=False)
+    except ValueError:
+        return None
+
+
+def _bucket_key(network, prefix):
+    if network.prefixlen >= prefix:
+        return str(network.supernet(new_prefix=prefix))
+    return str(network)
+
+
+def _units(target, split_prefix, expand_hosts):
+    """
+    把一个目标拆成可交错的单元
+    :return: [(桶键, 单元迭代器)]
+    """
+    network = _parse_network(target)
+    if network is None:
+        # 域名、八位组范围等: 作为整体, 独立成桶
+        return [(target, iter([target]))]
+    if network.version == 6:
+        # IPv6网段地址数巨大, 不展开也不切块
+        return [(_bucket_key(network, 64), iter([target]))]
+
+    if network.prefixlen >= split_prefix:
+        if expand_hosts and network.num_addresses > 1:
+            # 展开全部地址(含网络/广播地址), 与整个网段交给Nmap时的覆盖范围一致
+            hosts = (str(ip) for ip in network)
+        else:
+            hosts = iter([target])
+        return [(_bucket_key(network, split_prefix), hosts)]
+
+    # 大网段: 按 /24 切块, 每块一个桶; 块数超过 MAX_CHUNKS 时改用更大的块
+    prefix = min(split_prefix, network.prefixlen + MAX_CHUNKS.bit_length() - 1)
+    expand_hosts = expand_hosts and network.prefixlen >= MAX_EXPAND_PREFIX
+    chunks = network.subnets(new_prefix=prefix)
+    if expand_hosts:
+        return [(str(chunk), (str(ip) for ip in chunk)) for chunk in chunks]
+    return [(str(chunk), iter([str(chunk)])) for chunk in chunks]
+
+
+def interleave_targets(targets, split_prefix=24, expand_hosts=False, window=1024):
+    """
+    跨网段交错目标
+    :param targets: 目标可迭代对象(可为流式生成器)
+    :param split_prefix: 分桶网段长度(IPv4, 默认 /24)
+    :param expand_hosts: 是否将网段展开为单个主机
+    :param window: 每次读取并交错的输入目标数
+    :return: 交错后的目标/主机生成器
+    """
+    iterator = iter(targets)
+    while True:
+        chunk = list(islice(iterator, window))
+        if not chunk:
+            return
+
+        buckets = OrderedDict()
+        for target in chunk:
+            for key, units in _units(target, split_prefix, expand_hosts):
+                buckets.setdefault(key, deque()).append(units)
+
+        # 轮转: 每轮从每个桶取一个单元
+        ring = deque(buckets.values())
+        while ring:
+            sources = ring.popleft()
+            unit = next(sources[0], None)
+            if unit is None:
+                sources.popleft()
+                if sources:
+                    ring.appendleft(sources)
+                continue
+            yield unit
+            ring.append(sources)
+
+
+def order_targets(targets, mode='file', batch_size=0, window=1024, history=None):
+    """
+    按指定模式产生扫描任务
+    :param targets: 目标可迭代对象
+    :param mode: 'file' 保持文件顺序; 'interleave' 跨网段交错; 'priority' 按历史优先级(见 priority.py)
+    :param batch_size: >0 时每个任务包含多个主机(列表), 否则每个任务一个目标(字符串)
+    :param window: 交错窗口大小
+    :param history: ScanHistory 实例('priority' 模式需要)
+    :return: 任务生成器
+    """
+    if mode == 'interleave':
+        targets = interleave_targets(targets, expand_hosts=batch_size > 0, window=window)
+    elif mode == 'priority':
+        from priority import prioritize_targets
+        targets = prioritize_targets(targets, history)
+    if batch_size > 0:
+        return batched(targets, batch_size)
+    return iter(targets)
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+开放端口位图索引
+每个主机每种协议用一个 65536 位的位图表示开放端口(Python 大整数, 只占用到最高
+置位为止的空间), 同时维护 端口 -> 主机序号位图 的倒排索引
+(倒排位图在查询时由累积的主机序号批量生成, 逐个置位会反复复制越来越大的整数)
+
+端口集合查询、跨主机统计、两次扫描之间的差异比较都转化为位运算;
+索引可保存为 gzip 压缩的 JSON 文件, 供下一次扫描直接比较
+
+命令行用法:
+  python port_index.py query index.json.gz --all 445,3389
+  python port_index.py diff last_week.json.gz today.json.gz
+
+Author: Security Researcher
+License: MIT
+"""
+
+import argparse
+import base64
+import gzip
+import json
+
+INDEX_FORMAT_VERSION = 1
+
+
+def _iter_bits(bitmap):
+    """按从小到大的顺序迭代位图中置位的位置"""
+    if bitmap.bit_length() <= 65536:
+        # 端口位图: 置位少, 直接逐位清除
+        while bitmap:
+            low = bitmap & -bitmap
+            yield low.bit_length() - 1
+            bitmap ^= low
+        return
+    # 主机序号位图: 逐字节处理, 避免反复复制大整数
+    raw = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+    for offset, byte in enumerate(raw):
+        while byte:
+            low = byte & -byte
+            yield offset * 8 + low.bit_length() - 1
+            byte ^= low
+
+
+def _popcount(bitmap):
+    """统计置位数量"""
+    return bin(bitmap).count('1')
+
+
+def ports_to_bitmap(ports):
+    """端口号列表 -> 位图"""
+    bitmap = 0
+    for port in ports:
+        bitmap |= 1 << int(port)
+    return bitmap
+
+
+def bitmap_to_ports(bitmap):
+    """位图 -> 端口号列表(升序)"""
+    return list(_iter_bits(bitmap))
+
+
+def _encode_bitmap(bitmap):
+    raw = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+    return base64.b64encode(raw).decode('ascii')
+
+
+def _decode_bitmap(text):
+    return int.from_bytes(base64.b64decode(text), 'little')
+
+
+class PortIndex:
+    """开放端口位图索引"""
+
+    def __init__(self):
+        self._hosts = []          # 主机序号 -> IP
+        self._ordinals = {}       # IP -> 主机序号
+        self._host_bits = {}      # IP -> {协议: 端口位图}
+        self._port_hosts = {}     # (协议, 端口) -> 主机序号位图
+        self._pending = {}        # (协议, 端口) -> 尚未并入位图的主机序号列表
+
+    def __len__(self):
+        return len(self._host_bits)
+
+    def __contains__(self, ip):
+        return ip in self._host_bits
+
+    @property
+    def hosts(self):
+        """已索引的主机列表"""
+        return list(self._host_bits)
+
+    def update(self, results):
+        """
+        将一批扫描结果加入索引
+        :param results: parse_nmap_xml() 格式的结果字典
+        """
+        for ip, host_data in results.items():
+            by_proto = {}
+            for port_info in host_data['ports']:
+                by_proto.setdefault(port_info['protocol'], []).append(port_info['port'])
+            for protocol, ports in by_proto.items():
+                self.set_ports(ip, protocol, ports)
+
+    def set_ports(self, ip, protocol, ports):
+        """
+        设置(合并)某主机某协议的开放端口
+        :param ip: 主机IP
+        :param protocol: 协议(tcp/udp)
+        :param ports: 端口号列表或位图
+        """
+        ordinal = self._ordinals.get(ip)
+        if ordinal is None:
+            ordinal = len(self._hosts)
+            self._hosts.append(ip)
+            self._ordinals[ip] = ordinal
+
+        bitmap = ports if isinstance(ports, int) else ports_to_bitmap(ports)
+        protocols = self._host_bits.setdefault(ip, {})
+        added = bitmap & ~protocols.get(protocol, 0)
+        protocols[protocol] = protocols.get(protocol, 0) | bitmap
+
+        for port in _iter_bits(added):
+            self._pending.setdefault((protocol, port), []).append(ordinal)
+
+    def _port_bitmaps(self):
+        """倒排索引 (协议, 端口) -> 主机序号位图, 先把累积的主机序号批量并入"""
+        if self._pending:
+            for key, ordinals in self._pending.items():
+                bits = bytearray(max(ordinals) // 8 + 1)
+                for ordinal in ordinals:
+                    bits[ordinal >> 3] |= 1 << (ordinal & 7)
+                self._port_hosts[key] = self._port_hosts.get(key, 0) | int.from_bytes(bits, 'little')
+            self._pending = {}
+        return self._port_hosts
+
+    def bitmap(self, ip, protocol='tcp'):
+        """返回主机某协议的端口位图"""
+        return self._host_bits.get(ip, {}).get(protocol, 0)
+
+    def ports_of(self, ip, protocol='tcp'):
+        """返回主机某协议的开放端口列表"""
+        return bitmap_to_ports(self.bitmap(ip, protocol))
+
+    def _hosts_of(self, host_bitmap):
+        return [self._hosts[ordinal] for ordinal in _iter_bits(host_bitmap)]
+
+    def hosts_with_all(self, ports, protocol='tcp'):
+        """同时开放全部指定端口的主机"""
+        ports = list(ports)
+        if not ports:
+            return []
+        port_hosts = self._port_bitmaps()
+        result = -1
+        for port in ports:
+            result &= port_hosts.get((protocol, int(port)), 0)
+            if not result:
+                return []
+        return self._hosts_of(result)
+
+    def hosts_with_any(self, ports, protocol='tcp'):
+        """开放任一指定端口的主机"""
+        port_hosts = self._port_bitmaps()
+        result = 0
+        for port in ports:
+            result |= port_hosts.get((protocol, int(port)), 0)
+        return self._hosts_of(result)
+
+    def port_counts(self, protocol='tcp'):
+        """各端口的开放主机数 {端口: 主机数}"""
+        return {port: _popcount(bitmap)
+                for (proto, port), bitmap in self._port_bitmaps().items()
+                if proto == protocol}
+
+    def union_bitmap(self, protocol='tcp'):
+        """全部主机开放端口的并集位图"""
+        result = 0
+        for protocols in self._host_bits.values():
+            result |= protocols.get(protocol, 0)
+        return result
+
+    def diff(self, newer):
+        """
+        与另一个(更新的)索引比较
+        :param newer: 新一次扫描的 PortIndex
+        :return: {'new_hosts': [...], 'gone_hosts': [...],
+                  'opened': {ip: {协议: [端口]}}, 'closed': {ip: {协议: [端口]}}}
+        """
+        changes = {
+            'new_hosts': [ip for ip in newer._host_bits if ip not in self._host_bits],
+            'gone_hosts': [ip for ip in self._host_bits if ip not in newer._host_bits],
+            'opened': {},
+            'closed': {}
+        }
+        for ip in set(self._host_bits) | set(newer._host_bits):
+            old = self._host_bits.get(ip, {})
+            new = newer._host_bits.get(ip, {})
+            for protocol in set(old) | set(new):
+                old_bits = old.get(protocol, 0)
+                new_bits = new.get(protocol, 0)
+                if old_bits == new_bits:
+                    continue
+                opened = new_bits & ~old_bits
+                closed = old_bits & ~new_bits
+                if opened:
+                    changes['opened'].setdefault(ip, {})[protocol] = bitmap_to_ports(opened)
+                if closed:
+                    changes['closed'].setdefault(ip, {})[protocol] = bitmap_to_ports(closed)
+        return changes
+
+    def save(self, path):
+        """保存索引(gzip压缩JSON, 位图以base64编码)"""
+        data = {
+            'version': INDEX_FORMAT_VERSION,
+            'hosts': {ip: {protocol: _encode_bitmap(bitmap)
+                           for protocol, bitmap in protocols.items()}
+                      for ip, protocols in self._host_bits.items()}
+        }
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path):
+        """从文件加载索引"""
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != INDEX_FORMAT_VERSION:
+            raise ValueError(f"不支持的索引文件版本: {data.get('version')}")
+        index = cls()
+        for ip, protocols in data['hosts'].items():
+            for protocol, text in protocols.items():
+                index.set_ports(ip, protocol, _decode_bitmap(text))
+        return index
+
+
+def print_diff(changes):
+    """打印两次扫描之间的差异"""
+    print(f"[*] 新增主机: {len(changes['new_hosts'])}, 消失主机: {len(changes['gone_hosts'])}")
+    for ip in changes['new_hosts']:
+        print(f"    [+] 新主机 {ip}")
+    for ip in changes['gone_hosts']:
+        print(f"    [-] 主机消失 {ip}")
+    for ip, protocols in sorted(changes['opened'].items()):
+        for protocol, ports in protocols.items():
+            print(f"    [+] {ip} 新开放 {protocol}: {','.join(map(str, ports))}")
+    for ip, protocols in sorted(changes['closed'].items()):
+        for protocol, ports in protocols.items():
+            print(f"    [-] {ip} 已关闭 {protocol}: {','.join(map(str, ports))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='开放端口位图索引查询与比较')
+    sub = parser.add_subparsers(dest='command')
+
+    query = sub.add_parser('query', help='端口集合查询')
+    query.add_argument('index', help='索引文件')
+    query.add_argument('--all', help='同时开放全部端口(逗号分隔)')
+    query.add_argument('--any', help='开放任一端口(逗号分隔)')
+    query.add_argument('--protocol', default='tcp', help='协议(默认: tcp)')
+
+    diff = sub.add_parser('diff', help='比较两次扫描')
+    diff.add_argument('old', help='旧索引文件')
+    diff.add_argument('new', help='新索引文件')
+
+    args = parser.parse_args()
+
+    if args.command == 'query':
+        index = PortIndex.load(args.index)
+        if args.all:
+            hosts = index.hosts_with_all(args.all.split(','), args.protocol)
+        elif args.any:
+            hosts = index.hosts_with_any(args.any.split(','), args.protocol)
+        else:
+            parser.error('query 需要 --all 或 --any')
+        for ip in hosts:
+            print(ip)
+        print(f"[*] 共 {len(hosts)} 个主机")
+    elif args.command == 'diff':
+        print_diff(PortIndex.load(args.old).diff(PortIndex.load(args.new)))
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
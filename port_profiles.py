@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+从历史结果学习端口配置
+固定的常见端口列表会漏掉本环境中常见的端口, 也会探测从未开放过的端口;
+本模块按扫描历史(见 history.py)统计各网段开放端口的出现频率, 选出覆盖指定比例历史发现的
+最小端口集合, 保存为命名的端口配置, 扫描时以 `-p profile:名称` 使用
+
+- 每个网段(/24)的发现按该网段内的比例计分, 再在网段间平均, 大网段不会淹没小网段
+- 按分数从高到低贪心选取端口, 直到平均每个网段的覆盖率达到目标
+- 配置记录其来源历史文件与参数, 历史文件更新后使用配置时自动重建
+
+注意: 用配置扫描得到的历史只包含配置内的端口, 建议定期用完整端口列表扫描补充历史
+
+Author: Security Researcher
+License: MIT
+"""
+
+import ipaddress
+import json
+import os
+import time
+from collections import Counter, defaultdict
+
+from fleet_stats import subnet_of
+
+DEFAULT_PROFILES_FILE = 'port_profiles.json'
+PROFILE_PREFIX = 'profile:'
+
+
+def learn_ports(hosts, coverage=0.95, scope=None, protocol='tcp'):
+    """
+    从主机结果学习端口集合
+    :param hosts: {ip: 主机结果字典}
+    :param coverage: 目标覆盖率(0-1)
+    :param scope: 只统计该网段(CIDR)内的主机, None表示全部
+    :param protocol: 协议
+    :return: (排序后的端口列表, 统计信息字典)
+    """
+    network = ipaddress.ip_network(scope, strict=False) if scope else None
+    per_segment = defaultdict(Counter)
+    host_count = 0
+    for ip, host_data in hosts.items():
+        if network is not None and ipaddress.ip_address(ip) not in network:
+            continue
+        host_count += 1
+        per_segment[subnet_of(ip)].update(
+            p['port'] for p in host_data['ports'] if p['protocol'] == protocol)
+
+    scores = Counter()
+    segments = 0
+    findings = 0
+    for counts in per_segment.values():
+        total = sum(counts.values())
+        if not total:
+            continue
+        segments += 1
+        findings += total
+        for port, hits in counts.items():
+            scores[port] += hits / total
+
+    selected = []
+    covered = 0.0
+    for port, score in sorted(scores.items(), key=lambda item: (-item[1], item[0])):
+        if covered >= coverage * segments - 1e-9:
+            break
+        selected.append(port)
+        covered += score
+
+    return sorted(selected), {
+        'hosts': host_count,
+        'segments': segments,
+        'findings': findings,
+        'coverage': covered / segments if segments else 0.0,
+    }
+
+
+class PortProfiles:
+    """命名端口配置存储(JSON文件)"""
+
+    def __init__(self, path=DEFAULT_PROFILES_FILE):
+        self.path = path
+        self.profiles = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.profiles = json.load(f)
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.profiles, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def learn(self, name, history_file, coverage=0.95, scope=None):
+        """
+        从历史文件学习并保存端口配置
+        :return: 配置字典
+        """
+        from history import ScanHistory
+
+        if not os.path.exists(history_file):
+            raise ValueError(f"历史文件不存在: {history_file}")
+        history = ScanHistory(history_file)
+        ports, stats = learn_ports(
+            {ip: entry['data'] for ip, entry in history.hosts.items()}, coverage, scope)
+        profile = dict(stats, ports=ports, history=os.path.abspath(history_file),
+                       target_coverage=coverage, scope=scope, built=time.time())
+        self.profiles[name] = profile
+        self.save()
+        return profile
+
+    def get(self, name):
+        """
+        获取端口配置的端口列表; 来源历史文件比配置新时自动重建
+        :raises ValueError: 配置不存在或为空
+        """
+        profile = self.profiles.get(name)
+        if profile is None:
+            raise ValueError(f"端口配置不存在: {name} (配置文件: {self.path})")
+        history_file = profile['history']
+        if os.path.exists(history_file) and os.path.getmtime(history_file) > profile['built']:
+            print(f"[*] 扫描历史已更新, 重建端口配置: {name}")
+            profile = self.learn(name, history_file, profile['target_coverage'], profile['scope'])
+        if not profile['ports']:
+            raise ValueError(f"端口配置为空: {name}")
+        return profile['ports']
+
+
+def resolve_ports(spec, profiles_file=DEFAULT_PROFILES_FILE):
+    """
+    把 `profile:名称` 形式的端口参数展开为Nmap端口参数, 其他写法原样返回
+    """
+    if not spec or not spec.startswith(PROFILE_PREFIX):
+        return spec
+    from port_shards import format_ports
+
+    return format_ports(PortProfiles(profiles_file).get(spec[len(PROFILE_PREFIX):]))
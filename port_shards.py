@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+端口范围分片
+对少量高价值主机做全端口扫描(-p 1-65535)时, 每个主机只有一个Nmap进程, 空闲的并发能力用不上;
+把端口范围切成N段由N个进程并行做端口发现(不做服务识别), 再对发现的开放端口做一次服务识别,
+每个开放端口只探测一次服务
+
+Author: Security Researcher
+License: MIT
+"""
+
+import re
+
+MAX_PORT = 65535
+
+_RANGE = re.compile(r'^(\d*)-(\d*)$')
+
+
+def parse_port_spec(spec):
+    """
+    解析Nmap端口参数(如 "22,80,1000-2000", "-", "1024-")
+    :return: 排序去重后的端口列表; 含服务名或协议前缀(T:/U:)等无法展开的写法时返回None
+    """
+    ports = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if part.isdigit():
+            ports.add(int(part))
+            continue
+        match = _RANGE.match(part)
+        if match is None:
+            return None
+        start = int(match.group(1) or 1)
+        end = int(match.group(2) or MAX_PORT)
+        if start > end or end > MAX_PORT:
+            return None
+        ports.update(range(start, end + 1))
+    return sorted(ports)
+
+
+def format_ports(ports):
+    """把排序后的端口列表压缩为Nmap端口参数(连续端口合并为范围)"""
+    parts = []
+    start = prev = None
+    for port in ports:
+        if prev is not None and port == prev + 1:
+            prev = port
+            continue
+        if start is not None:
+            parts.append(str(start) if start == prev else f"{start}-{prev}")
+        start = prev = port
+    if start is not None:
+        parts.append(str(start) if start == prev else f"{start}-{prev}")
+    return ','.join(parts)
+
+
+def split_ports(ports, shards):
+    """
+    把端口列表均分为若干段
+    :param ports: 排序后的端口列表
+    :param shards: 段数
+    :return: Nmap端口参数列表(端口数少于段数时段数相应减少)
+    """
+    shards = max(1, min(shards, len(ports)))
+    size, extra = divmod(len(ports), shards)
+    chunks = []
+    start = 0
+    for i in range(shards):
+        end = start + size + (1 if i < extra else 0)
+        chunks.append(format_ports(ports[start:end]))
+        start = end
+    return chunks
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基于历史结果的优先级调度
+用扫描历史(见 history.py)给每个目标打分, 高价值目标先扫, 高风险发现尽早出现:
+
+  - 上次发现的开放端口数
+  - 上次发现的高风险服务(数据库、远程管理、未授权访问常见的服务)
+  - 距上次扫描的时间(越久越优先, 有上限)
+
+从未扫描过的目标按"很久未扫描"计分, 排在已知高风险目标之后、已知空网段之前
+
+目标流式读取, 在有界的预读窗口内按分数出队(堆), 窗口越大排序越接近全局最优
+
+Author: Security Researcher
+License: MIT
+"""
+
+import heapq
+import ipaddress
+import time
+from itertools import count
+
+# 高风险端口(取自 main.COMMON_PORTS 中的数据库/远程管理/未授权访问类服务)
+RISKY_PORTS = {
+    23: 'Telnet', 445: 'SMB', 1433: 'MSSQL', 1521: 'Oracle', 2181: 'Zookeeper',
+    2375: 'Docker', 3306: 'MySQL', 3389: 'RDP', 5432: 'PostgreSQL', 5984: 'CouchDB',
+    6379: 'Redis', 9200: 'Elasticsearch', 11211: 'Memcached', 27017: 'MongoDB',
+    50070: 'Hadoop',
+}
+
+PORT_WEIGHT = 1.0        # 每个开放端口
+RISKY_WEIGHT = 10.0      # 每个高风险端口(额外)
+STALE_WEIGHT = 0.5       # 距上次扫描每天
+STALE_CAP_DAYS = 30      # 时间分上限(天)
+
+
+def host_score(host_data):
+    """单个主机的历史分数"""
+    ports = host_data['ports']
+    risky = sum(1 for p in ports if p['protocol'] == 'tcp' and p['port'] in RISKY_PORTS)
+    return len(ports) * PORT_WEIGHT + risky * RISKY_WEIGHT
+
+
+def target_score(target, history, now=None):
+    """
+    目标优先级分数
+    :param target: 目标
+    :param history: ScanHistory 实例
+    :param now: 当前时间戳
+    :return: 分数(越大越优先)
+    """
+    now = now or time.time()
+    entry = history.target(target)
+    if entry is None:
+        return STALE_CAP_DAYS * STALE_WEIGHT
+
+    age_days = max(0.0, now - entry['last_scanned']) / 86400
+    score = min(age_days, STALE_CAP_DAYS) * STALE_WEIGHT
+    for ip in entry['hosts']:
+        host = history.hosts.get(ip)
+        if host is not None:
+            score += host_score(host['data'])
+    return score
+
+
+def prioritize_targets(targets, history, window=4096):
+    """
+    按优先级产生目标
+    :param targets: 目标可迭代对象(可为流式生成器)
+    :param history: ScanHistory 实例
+    :param window: 预读窗口大小
+    :return: 目标生成器
+    """
+    now = time.time()
+    heap = []
+    tie = count()  # 同分目标保持文件顺序
+    for target in targets:
+        heapq.heappush(heap, (-target_score(target, history, now), next(tie), target))
+        if len(heap) >= window:
+            yield heapq.heappop(heap)[2]
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+
+def split_results(targets, results):
+    """
+    把一批目标的合并结果拆回各个目标(记录历史用)
+    :param targets: 目标列表
+    :param results: parse_nmap_xml() 格式的结果字典
+    :return: {目标: 结果字典}
+    """
+    networks = []
+    for target in targets:
+        try:
+            networks.append(ipaddress.ip_network(target, strict=False))
+        except ValueError:
+            networks.append(None)
+
+    split = {target: {} for target in targets}
+    for ip, host_data in results.items():
+        address = ipaddress.ip_address(ip)
+        for target, network in zip(targets, networks):
+            if network is not None:
+                matched = address.version == network.version and address in network
+            else:
+                matched = target == ip or target.rstrip('.') in host_data['hostnames']
+            if matched:
+                split[target][ip] = host_data
+                break
+    return split
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分阶段性能剖析
+用 cProfile + tracemalloc 包裹扫描的各个阶段(扫描、XML解析、报告生成等),
+每个阶段输出:
+  <目录>/<阶段>.pstats       可用 `python -m pstats` 或 snakeviz 查看
+  <目录>/<阶段>.alloc.txt    阶段内新增内存分配 Top-N(按代码行)
+结束时打印各阶段耗时、内存峰值与热点函数摘要
+
+阶段可以嵌套(如报告阶段内的主机详情阶段), 进入内层阶段时外层的 cProfile 暂停,
+各阶段的CPU统计互不重叠; 同名阶段多次进入时累加
+
+Author: Security Researcher
+License: MIT
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class _PhaseStats:
+    """单个阶段的累计数据"""
+
+    def __init__(self, name):
+        self.name = name
+        self.profile = cProfile.Profile()
+        self.calls = 0
+        self.wall_time = 0.0
+        self.mem_growth = 0
+        self.mem_peak = 0
+        self.snapshot_diff = None
+
+
+class PhaseProfiler:
+    """分阶段 cProfile + tracemalloc 剖析器"""
+
+    def __init__(self, output_dir='profile', top=10, trace_frames=1):
+        """
+        :param output_dir: 输出目录
+        :param top: 摘要和分配报告中列出的条目数
+        :param trace_frames: tracemalloc 记录的栈帧深度
+        """
+        self.output_dir = output_dir
+        self.top = top
+        self.phases = {}
+        self._stack = []
+        os.makedirs(output_dir, exist_ok=True)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(trace_frames)
+
+    @contextmanager
+    def phase(self, name, snapshot=True):
+        """
+        剖析一个阶段
+        :param name: 阶段名称
+        :param snapshot: 是否在进入/退出时拍摄内存快照(用于分配Top-N报告);
+                         频繁调用的小阶段应关闭, 只统计内存增量与峰值
+        """
+        stats = self.phases.get(name)
+        if stats is None:
+            stats = self.phases[name] = _PhaseStats(name)
+
+        # 暂停外层阶段, 避免CPU时间重复计入
+        outer, outer_mem_start = self._stack[-1] if self._stack else (None, 0)
+        if outer is not None:
+            outer.profile.disable()
+
+        before = tracemalloc.take_snapshot() if snapshot else None
+        mem_start = tracemalloc.get_traced_memory()[0]
+        self._stack.append((stats, mem_start))
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        stats.profile.enable()
+        try:
+            yield stats
+        finally:
+            stats.profile.disable()
+            stats.wall_time += time.perf_counter() - start
+            stats.calls += 1
+            current, peak = tracemalloc.get_traced_memory()
+            stats.mem_growth += current - mem_start
+            stats.mem_peak = max(stats.mem_peak, peak - mem_start)
+            if before is not None:
+                diff = tracemalloc.take_snapshot().compare_to(before, 'lineno')
+                stats.snapshot_diff = diff if stats.snapshot_diff is None else \
+                    _merge_diffs(stats.snapshot_diff, diff)
+            self._stack.pop()
+            if outer is not None:
+                # reset_peak() 会清掉外层阶段的峰值, 这里把内层峰值折算回外层
+                outer.mem_peak = max(outer.mem_peak, peak - outer_mem_start)
+                outer.profile.enable()
+
+    def write_reports(self):
+        """写出各阶段的 .pstats 和 .alloc.txt 文件"""
+        for name, stats in self.phases.items():
+            stats.profile.dump_stats(os.path.join(self.output_dir, f"{name}.pstats"))
+            with open(os.path.join(self.output_dir, f"{name}.alloc.txt"), 'w',
+                      encoding='utf-8') as f:
+                f.write(f"# {name}: calls={stats.calls} wall={stats.wall_time:.3f}s "
+                        f"growth={_fmt_size(stats.mem_growth)} peak={_fmt_size(stats.mem_peak)}\n")
+                if stats.snapshot_diff is None:
+                    f.write("# (该阶段未拍摄内存快照, 分配明细见外层阶段)\n")
+                    continue
+                for entry in stats.snapshot_diff[:self.top * 5]:
+                    f.write(f"{_fmt_size(entry.size_diff):>10}  {entry.count_diff:>+8}  "
+                            f"{entry.traceback}\n")
+
+    def print_summary(self):
+        """打印各阶段热点摘要"""
+        print("\n" + "=" * 60)
+        print(f"[*] 性能剖析摘要 (详细数据: {os.path.abspath(self.output_dir)})")
+        for name, stats in self.phases.items():
+            print(f"\n[*] 阶段 {name}: {stats.calls} 次, 耗时 {stats.wall_time:.3f}s, "
+                  f"内存增长 {_fmt_size(stats.mem_growth)}, 峰值 {_fmt_size(stats.mem_peak)}")
+            for tottime, cumtime, label in self._hot_functions(stats)[:5]:
+                print(f"    {tottime:8.3f}s  (累计 {cumtime:8.3f}s)  {label}")
+            if stats.snapshot_diff:
+                for entry in stats.snapshot_diff[:3]:
+                    print(f"    内存 {_fmt_size(entry.size_diff):>10}  {entry.traceback}")
+        print("=" * 60)
+
+    def finish(self):
+        """写出报告、打印摘要并停止内存跟踪"""
+        self.write_reports()
+        self.print_summary()
+        tracemalloc.stop()
+
+    @staticmethod
+    def _hot_functions(stats):
+        buffer = io.StringIO()
+        try:
+            data = pstats.Stats(stats.profile, stream=buffer).stats
+        except TypeError:
+            # 阶段内没有任何Python调用
+            return []
+        rows = []
+        for (filename, lineno, func), (_, _, tottime, cumtime, _) in data.items():
+            label = f"{os.path.basename(filename)}:{lineno}({func})" if lineno else func
+            rows.append((tottime, cumtime, label))
+        rows.sort(reverse=True)
+        return rows
+
+
+def _merge_diffs(first, second):
+    """合并两次快照差异(同名阶段多次进入时)"""
+    merged = {}
+    for entry in list(first) + list(second):
+        key = str(entry.traceback)
+        size, count, obj = merged.get(key, (0, 0, entry))
+        merged[key] = (size + entry.size_diff, count + entry.count_diff, obj)
+    result = []
+    for size, count, obj in merged.values():
+        result.append(_DiffEntry(obj.traceback, size, count))
+    result.sort(key=lambda e: abs(e.size_diff), reverse=True)
+    return result
+
+
+class _DiffEntry:
+    __slots__ = ('traceback', 'size_diff', 'count_diff')
+
+    def __init__(self, traceback, size_diff, count_diff):
+        self.traceback = traceback
+        self.size_diff = size_diff
+        self.count_diff = count_diff
+
+
+def _fmt_size(size):
+    sign = '-' if size < 0 else ''
+    size = abs(size)
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{sign}{size:.0f}{unit}" if unit == 'B' else f"{sign}{size:.1f}{unit}"
+        size /= 1024
+    return f"{sign}{size:.1f}GB"
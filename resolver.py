@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+域名目标预解析
+Nmap逐个串行解析域名, 也不知道多个域名指向同一IP, 同一主机会被重复扫描;
+本模块在扫描前用线程池并发解析目标中的域名, 与目标中直接写出的IP一起按IP去重后只扫描一次,
+并记录每个IP对应的全部域名, 扫描结果中附加到该主机的 hostnames
+
+解析结果按固定TTL缓存(系统解析接口不返回记录TTL)
+
+Author: Security Researcher
+License: MIT
+"""
+
+import ipaddress
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from target_source import is_hostname
+
+
+class Resolver:
+    """带TTL缓存的并发域名解析器"""
+
+    def __init__(self, workers=16, ttl=300, negative_ttl=60):
+        """
+        :param workers: 解析线程数
+        :param ttl: 解析成功结果的缓存秒数
+        :param negative_ttl: 解析失败结果的缓存秒数
+        """
+        self.workers = workers
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._cache = {}  # 域名 -> (过期时间, IP 或 None)
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.cache_hits = 0
+
+    def _lookup(self, name):
+        try:
+            infos = socket.getaddrinfo(name, None, socket.AF_INET, socket.SOCK_STREAM)
+        except (socket.gaierror, UnicodeError, OSError):
+            return None
+        # 与Nmap一致: 多条A记录时只扫描第一个地址
+        return infos[0][4][0] if infos else None
+
+    def resolve(self, name):
+        """解析单个域名, 返回IPv4地址, 失败返回None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(name)
+            if entry is not None and entry[0] > now:
+                self.cache_hits += 1
+                return entry[1]
+        ip = self._lookup(name)
+        with self._lock:
+            self.lookups += 1
+            self._cache[name] = (now + (self.ttl if ip else self.negative_ttl), ip)
+        return ip
+
+    def resolve_many(self, names):
+        """
+        并发解析多个域名
+        :return: {域名: IP 或 None}
+        """
+        names = list(dict.fromkeys(names))
+        if len(names) <= 1:
+            return {name: self.resolve(name) for name in names}
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(names))) as pool:
+            return dict(zip(names, pool.map(self.resolve, names)))
+
+
+def _single_ip(target):
+    """目标为单个IP地址时返回其规范形式, 否则返回None"""
+    try:
+        return str(ipaddress.ip_address(target))
+    except ValueError:
+        return None
+
+
+def resolve_targets(targets, resolver, aliases, window=1024):
+    """
+    把目标流中的域名替换为IP, 同一IP(多个域名, 或域名与直接写出的IP)只产生一次
+    网段、八位组范围等不参与去重; 已产生的IP全部记录, 内存随不同IP数增长
+    域名在其IP已产生(甚至已扫描完)之后才读到时, 仍加入 aliases, 由调用方补充到结果
+    :param targets: 目标可迭代对象(可为流式生成器)
+    :param resolver: Resolver 实例
+    :param aliases: 字典 {ip: [域名, ...]}, 就地更新, 供扫描结果附加主机名
+    :param window: 每次读取并批量解析的目标数
+    :return: 目标生成器
+    """
+    seen = set()  # 已产生的单个IP
+    iterator = iter(targets)
+    while True:
+        chunk = list(islice(iterator, window))
+        if not chunk:
+            return
+
+        resolved = resolver.resolve_many(t.rstrip('.') for t in chunk if is_hostname(t))
+        for target in chunk:
+            if not is_hostname(target):
+                ip = _single_ip(target)
+                if ip is None:
+                    yield target
+                elif ip not in seen:
+                    seen.add(ip)
+                    yield target
+                continue
+            name = target.rstrip('.')
+            ip = resolved[name]
+            if ip is None:
+                print(f"[!] 无法解析域名: {name}")
+                continue
+            names = aliases.setdefault(ip, [])
+            if name not in names:
+                names.append(name)
+            if ip not in seen:
+                seen.add(ip)
+                yield ip
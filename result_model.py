@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+紧凑型扫描结果模型
+使用 __slots__ 类代替嵌套字典保存主机与端口信息, 并对协议、服务、产品等
+高重复度字符串做驻留(intern), 大规模扫描结果的内存占用显著降低
+
+PortRecord / HostRecord 均实现只读 Mapping 接口, 可以像原来的字典一样
+通过 port_info['service'] 访问, HTMLReportGenerator 等代码无需修改
+
+运行 python result_model.py 可对比两种结构的内存占用
+
+Author: Security Researcher
+License: MIT
+"""
+
+import sys
+from collections.abc import Mapping
+
+_intern = sys.intern
+
+# 无脚本输出时共享的空元组
+_NO_SCRIPTS = ()
+
+
+class _SlotMapping(Mapping):
+    """基于 __slots__ 的只读字典视图"""
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)!r})"
+
+    def to_dict(self):
+        """转换为普通字典(用于JSON序列化)"""
+        return dict(self)
+
+
+class PortRecord(_SlotMapping):
+    """单个开放端口"""
+
+    __slots__ = ('port', 'protocol', 'service', 'product', 'version', 'extra', 'scripts')
+
+    def __init__(self, port, protocol, service='unknown', product='', version='',
+                 extra='', scripts=None):
+        """
+        :param port: 端口号
+        :param protocol: 协议(tcp/udp)
+        :param service: 服务名
+        :param product: 产品名
+        :param version: 版本号
+        :param extra: 附加信息
+        :param scripts: 脚本输出列表 [{'id':..., 'output':...}]
+        """
+        self.port = int(port)
+        self.protocol = _intern(protocol or '')
+        self.service = _intern(service or 'unknown')
+        self.product = _intern(product or '')
+        self.version = _intern(version or '')
+        self.extra = _intern(extra or '')
+        self.scripts = tuple(scripts) if scripts else _NO_SCRIPTS
+
+    def to_dict(self):
+        data = dict(self)
+        data['scripts'] = [dict(script) for script in self.scripts]
+        return data
+
+
+class HostRecord(_SlotMapping):
+    """单个存活主机"""
+
+    __slots__ = ('hostnames', 'os', 'ports')
+
+    def __init__(self, hostnames=None, os=None, ports=None):
+        """
+        :param hostnames: 主机名列表
+        :param os: 操作系统信息 {'name':..., 'accuracy':...} 或 None
+        :param ports: PortRecord 列表
+        """
+        self.hostnames = list(hostnames) if hostnames else []
+        self.os = os
+        self.ports = ports if ports is not None else []
+
+    @classmethod
+    def from_dict(cls, data):
+        """由普通字典(如JSON反序列化结果)构建 HostRecord"""
+        if isinstance(data, cls):
+            return data
+        os_info = data.get('os')
+        ports = [port if isinstance(port, PortRecord) else PortRecord(
+                     port['port'], port['protocol'], port.get('service'), port.get('product'),
+                     port.get('version'), port.get('extra'), port.get('scripts'))
+                 for port in data.get('ports', [])]
+        return cls(data.get('hostnames'),
+                   make_os_info(os_info.get('name'), os_info.get('accuracy')) if os_info else None,
+                   ports)
+
+    def to_dict(self):
+        return {
+            'hostnames': list(self.hostnames),
+            'os': dict(self.os) if self.os else None,
+            'ports': [to_plain(port) for port in self.ports]
+        }
+
+
+def merge_hosts(old, new):
+    """
+    合并同一主机的两次结果(如TCP与UDP扫描), 同一端口以新结果为准
+    :return: 新的 HostRecord, 端口按协议、端口号排序
+    """
+    ports = {(port['protocol'], port['port']): port for port in old['ports']}
+    ports.update(((port['protocol'], port['port']), port) for port in new['ports'])
+    hostnames = list(old['hostnames'])
+    hostnames.extend(name for name in new['hostnames'] if name not in hostnames)
+    return HostRecord(hostnames, new['os'] or old['os'],
+                      [ports[key] for key in sorted(ports)])
+
+
+def to_plain(record):
+    """将 PortRecord/HostRecord 或普通字典统一转换为可JSON序列化的字典"""
+    if isinstance(record, _SlotMapping):
+        return record.to_dict()
+    return record
+
+
+def make_os_info(name, accuracy):
+    """构建操作系统信息字典(字符串驻留)"""
+    return {
+        'name': _intern(name) if name else name,
+        'accuracy': _intern(accuracy) if accuracy else accuracy
+    }
+
+
+def _benchmark(hosts=20000, ports_per_host=15):
+    """对比嵌套字典与紧凑模型的内存占用"""
+    import tracemalloc
+
+    services = [('tcp', 'http', 'Apache httpd', '2.4.41'), ('tcp', 'ssh', 'OpenSSH', '8.2p1'),
+                ('tcp', 'https', 'nginx', '1.18.0'), ('tcp', 'mysql', 'MySQL', '5.7.33')]
+
+    def build(factory):
+        results = {}
+        for h in range(hosts):
+            ip = f"10.{h >> 16 & 255}.{h >> 8 & 255}.{h & 255}"
+            ports = []
+            for p in range(ports_per_host):
+                proto, name, product, version = services[p % len(services)]
+                # 模拟XML解析: 每次得到的都是新的字符串对象
+                ports.append(factory(p + 1, ''.join(proto), ''.join(name),
+                                     ''.join(product), ''.join(version)))
+            results[ip] = ports
+        return results
+
+    def as_dict(port, proto, name, product, version):
+        return {'port': port, 'protocol': proto, 'service': name, 'product': product,
+                'version': version, 'extra': '', 'scripts': []}
+
+    def as_record(port, proto, name, product, version):
+        return PortRecord(port, proto, name, product, version)
+
+    sizes = {}
+    for label, factory in (('dict', as_dict), ('PortRecord', as_record)):
+        tracemalloc.start()
+        data = build(factory)
+        sizes[label] = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del data
+
+    print(f"[*] {hosts} 个主机 x {ports_per_host} 个端口")
+    for label, size in sizes.items():
+        print(f"    {label:<12} {size / 1024 / 1024:8.2f} MB")
+    print(f"[+] 内存节省: {(1 - sizes['PortRecord'] / sizes['dict']) * 100:.1f}%")
+
+
+if __name__ == '__main__':
+    _benchmark()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+扫描结果输出管道
+每个扫描任务解析出的主机结果发布到管道, 由注册的各个输出(sink)在各自的线程中并发消费:
+流式导出器(见 exporters.py)、数据库写入、告警等都以同一接口挂接, 无需修改扫描流程
+
+- 输出接口: write_hosts(results) 必需, open() / close() 可选; results 为 {ip: 主机结果}
+- 补充记录: 已输出主机的后续结果(如UDP通道晚于TCP通道完成)通过 write_updates(results) 输出,
+  输出未实现该方法时交给 write_hosts
+- 每个输出一个有界队列: 队列满时发布方(扫描主线程)阻塞等待, 慢输出使扫描暂停而不是堆积内存
+- 输出抛出异常后被停用(之后的结果直接丢弃), 不会阻塞扫描
+- 每个输出单独统计吞吐量、延迟(发布到处理完成)、队列峰值与造成的背压等待时间
+
+自定义输出通过 `--sink 模块:类名[:参数]` 加载, 如 `--sink mysinks:AlertSink:https://hooks.example/x`
+
+Author: Security Researcher
+License: MIT
+"""
+
+import importlib
+import queue
+import threading
+import time
+
+DEFAULT_QUEUE_SIZE = 64
+
+_STOP = object()
+
+
+class ResultSink:
+    """结果输出基类(可选继承, 具有 write_hosts 方法的任意对象都可作为输出)"""
+
+    name = None
+
+    def open(self):
+        pass
+
+    def write_hosts(self, results):
+        raise NotImplementedError
+
+    def write_updates(self, results):
+        self.write_hosts(results)
+
+    def close(self):
+        pass
+
+
+def sink_name(sink):
+    return getattr(sink, 'name', None) or type(sink).__name__
+
+
+def load_sink(spec):
+    """
+    按 `模块:类名[:参数]` 创建自定义输出
+    :param spec: 输出描述, 参数(如有)作为唯一的字符串参数传给类
+    :raises ValueError: 格式错误或无法加载
+    """
+    parts = spec.split(':', 2)
+    if len(parts) < 2 or not parts[0] or not parts[1]:
+        raise ValueError(f"输出格式应为 模块:类名[:参数]: {spec}")
+    try:
+        factory = getattr(importlib.import_module(parts[0]), parts[1])
+    except (ImportError, AttributeError) as e:
+        raise ValueError(f"无法加载输出 {spec}: {e}")
+    return factory(parts[2]) if len(parts) == 3 else factory()
+
+
+class _SinkLane:
+    """单个输出的队列、消费线程与统计"""
+
+    def __init__(self, sink, queue_size):
+        self.sink = sink
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.thread = None
+        self.failed = False
+        self.batches = 0
+        self.hosts = 0
+        self.updates = 0        # 补充记录的主机数
+        self.busy = 0.0         # 处理耗时合计
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+        self.peak = 0           # 队列峰值
+        self.stalled = 0.0      # 发布方因队列满而等待的时间
+        self.stalls = 0
+
+    @property
+    def name(self):
+        # 导出器打开文件时可能补全文件名(如 .gz), 每次读取最新名称
+        return sink_name(self.sink)
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name=f"sink-{self.name}", daemon=True)
+        self.thread.start()
+
+    def put(self, results, update=False):
+        item = (time.monotonic(), results, update)
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            if not self.stalls:
+                print(f"[*] 结果输出 {self.name} 处理较慢, 扫描等待其队列腾出空间")
+            self.stalls += 1
+            start = time.monotonic()
+            self.queue.put(item)
+            self.stalled += time.monotonic() - start
+        self.peak = max(self.peak, self.queue.qsize())
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                return
+            if self.failed:
+                continue
+            published, results, update = item
+            write = getattr(self.sink, 'write_updates', self.sink.write_hosts) if update else self.sink.write_hosts
+            start = time.monotonic()
+            try:
+                write(results)
+            except Exception as e:
+                self.failed = True
+                print(f"[!] 结果输出 {self.name} 出错, 已停用: {e}")
+                continue
+            end = time.monotonic()
+            self.busy += end - start
+            lag = end - published
+            self.lag_total += lag
+            self.lag_max = max(self.lag_max, lag)
+            self.batches += 1
+            if update:
+                self.updates += len(results)
+            else:
+                self.hosts += len(results)
+
+    def stop(self):
+        if self.thread is not None:
+            self.queue.put(_STOP)
+            self.thread.join()
+            self.thread = None
+
+    def stats(self):
+        return {
+            'name': self.name,
+            'hosts': self.hosts,
+            'updates': self.updates,
+            'batches': self.batches,
+            'hosts_per_sec': (self.hosts + self.updates) / self.busy if self.busy else 0.0,
+            'avg_lag': self.lag_total / self.batches if self.batches else 0.0,
+            'max_lag': self.lag_max,
+            'queue_peak': self.peak,
+            'queue_size': self.queue.maxsize,
+            'stalled': self.stalled,
+            'failed': self.failed,
+        }
+
+
+class SinkPipeline:
+    """把扫描结果分发给多个并发输出的管道"""
+
+    def __init__(self, sinks=None, queue_size=DEFAULT_QUEUE_SIZE):
+        """
+        :param sinks: 输出列表
+        :param queue_size: 每个输出的队列容量(以扫描任务的结果批次计)
+        """
+        self.queue_size = queue_size
+        self.lanes = []
+        self.running = False
+        for sink in sinks or []:
+            self.add(sink)
+
+    def __bool__(self):
+        return bool(self.lanes)
+
+    def add(self, sink):
+        """注册输出(管道运行中注册时立即启动)"""
+        lane = _SinkLane(sink, self.queue_size)
+        self.lanes.append(lane)
+        if self.running:
+            self._start(lane)
+        return sink
+
+    def _start(self, lane):
+        open_sink = getattr(lane.sink, 'open', None)
+        if open_sink is not None:
+            open_sink()
+        lane.start()
+
+    def open(self):
+        """打开所有输出并启动消费线程"""
+        if self.running:
+            return
+        self.running = True
+        for lane in self.lanes:
+            self._start(lane)
+
+    def publish(self, results, update=False):
+        """
+        发布一批主机结果; 任一输出队列已满时阻塞(背压)
+        发布后调用方不应再修改 results
+        :param update: 是否为已发布主机的补充记录(交给输出的 write_updates)
+        """
+        for lane in self.lanes:
+            lane.put(results, update)
+
+    def close(self):
+        """等待各输出处理完队列中的结果, 关闭输出并打印统计"""
+        if not self.running:
+            return
+        self.running = False
+        for lane in self.lanes:
+            lane.stop()
+        for lane in self.lanes:
+            close_sink = getattr(lane.sink, 'close', None)
+            if close_sink is not None:
+                try:
+                    close_sink()
+                except Exception as e:
+                    print(f"[!] 结果输出 {lane.name} 关闭失败: {e}")
+        self.print_stats()
+
+    def stats(self):
+        """各输出的统计信息列表"""
+        return [lane.stats() for lane in self.lanes]
+
+    def print_stats(self):
+        for stats in self.stats():
+            print(f"[*] 结果输出 {stats['name']}: {stats['hosts']} 个主机"
+                  + (f" (另有 {stats['updates']} 条补充记录)" if stats['updates'] else '') + ", "
+                  f"{stats['hosts_per_sec']:.0f} 主机/秒, "
+                  f"延迟 平均 {stats['avg_lag'] * 1000:.1f} ms / 最大 {stats['max_lag'] * 1000:.1f} ms, "
+                  f"队列峰值 {stats['queue_peak']}/{stats['queue_size']}"
+                  + (f", 背压等待 {stats['stalled']:.2f} 秒" if stats['stalled'] else '')
+                  + (", 已停用" if stats['failed'] else ''))
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+可溢出到磁盘的先进先出队列
+并行扫描时UDP通道远慢于TCP通道, 等待UDP扫描的任务会不断积压; 积压全部放在内存中会随目标数增长,
+暂停读取目标又会让TCP通道按UDP的速度前进. 本队列在内存中只保留前 limit 项,
+其余按顺序写入临时文件(JSON Lines), 内存中的项取完后再从文件按序读回
+
+Author: Security Researcher
+License: MIT
+"""
+
+import json
+import tempfile
+from collections import deque
+
+
+class SpillQueue:
+    """先进先出队列, 超过内存上限的部分暂存到临时文件"""
+
+    def __init__(self, limit=1024, encode=None, decode=None):
+        """
+        :param limit: 内存中最多保留的项数
+        :param encode: 写入文件前把项转换为可JSON序列化的对象, None表示原样写入
+        :param decode: 从文件读回后还原项, None表示原样返回
+        """
+        self.limit = limit
+        self.encode = encode or (lambda item: item)
+        self.decode = decode or (lambda item: item)
+        self._memory = deque()
+        self._file = None
+        self._read_pos = 0
+        self._spilled = 0       # 文件中尚未读回的项数
+        self.spilled_total = 0  # 累计写入文件的项数
+
+    def __len__(self):
+        return len(self._memory) + self._spilled
+
+    def __bool__(self):
+        return bool(self._memory) or self._spilled > 0
+
+    def append(self, item):
+        # 文件中还有未读回的项时新项也必须写入文件, 保持先进先出
+        if not self._spilled and len(self._memory) < self.limit:
+            self._memory.append(item)
+            return
+        if self._file is None:
+            self._file = tempfile.TemporaryFile()
+        self._file.seek(0, 2)
+        self._file.write(json.dumps(self.encode(item), ensure_ascii=False).encode('utf-8') + b'\n')
+        self._spilled += 1
+        self.spilled_total += 1
+
+    def popleft(self):
+        if not self._memory and self._spilled:
+            self._refill()
+        return self._memory.popleft()
+
+    def _refill(self):
+        """从文件按序读回最多 limit 项; 全部读回后清空文件"""
+        self._file.seek(self._read_pos)
+        while self._spilled and len(self._memory) < self.limit:
+            self._memory.append(self.decode(json.loads(self._file.readline())))
+            self._spilled -= 1
+        self._read_pos = self._file.tell()
+        if not self._spilled:
+            self._file.seek(0)
+            self._file.truncate()
+            self._read_pos = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+目标流式读取
+逐行惰性读取目标文件、gzip压缩文件或标准输入(`-f -`), 边读边跳过注释并校验格式,
+内存占用与目标数量无关, 第一批目标读到即可开始扫描
+
+支持的目标格式: IPv4/IPv6地址、CIDR网段、Nmap八位组范围与列表(如 192.168.1.1-50、192.168.3-5,7.1、
+10.0.0.-100)、域名及域名/前缀长度(如 scanme.nmap.org/24)
+
+Author: Security Researcher
+License: MIT
+"""
+
+import gzip
+import io
+import ipaddress
+import re
+import sys
+from itertools import islice
+
+_GZIP_MAGIC = b'\x1f\x8b'
+# 八位组: 数字、范围(两端可省略)或 *, 可用逗号列出多项
+_OCTET_ITEM = r'(?:\d{1,3}-\d{1,3}|\d{1,3}-|-\d{1,3}|\d{1,3}|\*)'
+_OCTET = rf'{_OCTET_ITEM}(?:,{_OCTET_ITEM})*'
+_OCTET_RANGE = re.compile(rf'^{_OCTET}(?:\.{_OCTET}){{3}}$')
+_HOSTNAME = re.compile(r'^(?=.{1,253}$)(?!-)[A-Za-z0-9_-]{1,63}(?<!-)'
+                       r'(?:\.(?!-)[A-Za-z0-9_-]{1,63}(?<!-))*\.?$')
+
+
+def is_valid_target(target):
+    """检查目标格式是否合法(不允许以'-'开头, 防止被当作Nmap参数)"""
+    if not target or target.startswith('-'):
+        return False
+    try:
+        ipaddress.ip_network(target, strict=False)
+        return True
+    except ValueError:
+        pass
+    if _OCTET_RANGE.match(target):
+        return all(int(n) <= 255 for n in re.findall(r'\d+', target))
+    # 域名/前缀长度: Nmap解析域名后扫描所在网段
+    host, slash, prefix = target.partition('/')
+    if slash and not (prefix.isdigit() and int(prefix) <= 32):
+        return False
+    return bool(_HOSTNAME.match(host)) and not host.replace('.', '').isdigit()
+
+
+def is_hostname(target):
+    """目标是否为单个域名(非IP/CIDR/八位组范围/域名网段)"""
+    try:
+        ipaddress.ip_network(target, strict=False)
+        return False
+    except ValueError:
+        return '/' not in target and not _OCTET_RANGE.match(target)
+
+
+def open_target_stream(path):
+    """
+    打开目标来源为文本流
+    :param path: 文件路径, '-' 表示标准输入; gzip 格式按文件头自动识别
+    """
+    if path == '-':
+        raw = sys.stdin.buffer
+    else:
+        raw = open(path, 'rb')
+    buffered = raw if hasattr(raw, 'peek') else io.BufferedReader(raw)
+    if buffered.peek(2)[:2] == _GZIP_MAGIC:
+        buffered = gzip.GzipFile(fileobj=buffered)
+    return io.TextIOWrapper(buffered, encoding='utf-8', errors='replace')
+
+
+def iter_targets(path, on_invalid=None):
+    """
+    惰性迭代目标
+    :param path: 文件路径或 '-'
+    :param on_invalid: 回调 on_invalid(行号, 内容), 遇到非法目标时调用
+    :return: 目标生成器
+    """
+    with open_target_stream(path) as stream:
+        for lineno, line in enumerate(stream, 1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            if is_valid_target(line):
+                yield line
+            elif on_invalid is not None:
+                on_invalid(lineno, line)
+
+
+def batched(iterable, size):
+    """按批次切分迭代器(每批为列表), 不预先读取整个输入"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分布式扫描测试: 协调者与多个工作节点在本机协作, 扫描函数为模拟实现
+
+运行: python -m unittest test_distributed
+
+Author: Security Researcher
+License: MIT
+"""
+
+import contextlib
+import io
+import socket
+import threading
+import time
+import unittest
+
+from distributed import Coordinator, _recv, _send, run_worker
+from result_model import HostRecord, PortRecord
+
+
+def _fake_scan(target, delay=0.01):
+    time.sleep(delay)
+    return {target: HostRecord([], None, [PortRecord(22, 'tcp', 'ssh')])}
+
+
+class _WorkerThread(threading.Thread):
+    """在线程中运行工作节点, 记录返回值或异常"""
+
+    def __init__(self, address, scan_func, name):
+        super().__init__(daemon=True)
+        self.address = f"{address[0]}:{address[1]}"
+        self.scan_func = scan_func
+        self.worker_name = name
+        self.completed = None
+        self.error = None
+
+    def run(self):
+        try:
+            self.completed = run_worker(self.address, self.scan_func, name=self.worker_name,
+                                        connect_timeout=5)
+        except Exception as e:
+            self.error = e
+
+
+class CoordinatorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.output = contextlib.redirect_stdout(io.StringIO())
+        self.output.__enter__()
+        self.results = {}
+        self.scanned = 0
+
+    def tearDown(self):
+        self.output.__exit__(None, None, None)
+
+    def _on_results(self, shard_targets, results, scanned):
+        self.results.update(results)
+        self.scanned += scanned
+
+    def _coordinator(self, targets, **kwargs):
+        coordinator = Coordinator(targets, '127.0.0.1:0', on_results=self._on_results, **kwargs)
+        address = coordinator.start()
+        self.addCleanup(coordinator.stop)
+        return coordinator, address
+
+    def test_all_results_arrive(self):
+        targets = [f"10.0.0.{i}" for i in range(1, 21)]
+        coordinator, address = self._coordinator(targets, shard_size=3)
+        workers = [_WorkerThread(address, _fake_scan, f"w{i}") for i in range(3)]
+        for worker in workers:
+            worker.start()
+
+        self.assertTrue(coordinator.wait(timeout=10))
+        self.assertTrue(coordinator.wait_workers(timeout=10))
+        for worker in workers:
+            worker.join(timeout=10)
+            self.assertIsNone(worker.error)
+        self.assertEqual(set(self.results), set(targets))
+        self.assertEqual(self.scanned, len(targets))
+        # 被窃取的分片可能由两个节点各执行一次
+        self.assertGreaterEqual(sum(worker.completed for worker in workers), len(coordinator.shards))
+        self.assertEqual(coordinator.failed, [])
+
+    def test_shard_of_dying_worker_is_retried(self):
+        targets = [f"10.0.1.{i}" for i in range(1, 9)]
+        coordinator, address = self._coordinator(targets, shard_size=2)
+
+        def crash(target):
+            raise RuntimeError('nmap crashed')
+
+        dying = _WorkerThread(address, crash, 'dying')
+        dying.start()
+        dying.join(timeout=10)
+        self.assertIsInstance(dying.error, RuntimeError)
+
+        workers = [_WorkerThread(address, _fake_scan, f"w{i}") for i in range(2)]
+        for worker in workers:
+            worker.start()
+        self.assertTrue(coordinator.wait(timeout=10))
+        for worker in workers:
+            worker.join(timeout=10)
+            self.assertIsNone(worker.error)
+
+        self.assertEqual(set(self.results), set(targets))
+        self.assertEqual(coordinator.shards[0].failures, 1)
+        self.assertEqual(coordinator.failed, [])
+
+    def test_shard_fails_after_max_retries(self):
+        coordinator, address = self._coordinator(['10.0.2.1'], max_retries=1)
+
+        def crash(target):
+            raise RuntimeError('nmap crashed')
+
+        for i in range(2):
+            worker = _WorkerThread(address, crash, f"dying{i}")
+            worker.start()
+            worker.join(timeout=10)
+        self.assertTrue(coordinator.wait(timeout=10))
+        self.assertEqual([shard.id for shard in coordinator.failed], [0])
+        self.assertEqual(self.results, {})
+
+
+class WorkerExitTest(unittest.TestCase):
+    """协调者关闭连接时工作节点正常结束"""
+
+    def _serve_once(self, handler):
+        server = socket.socket()
+        server.bind(('127.0.0.1', 0))
+        server.listen(1)
+        self.addCleanup(server.close)
+
+        def serve():
+            conn, _ = server.accept()
+            with conn, conn.makefile('rb') as rfile, conn.makefile('wb') as wfile:
+                _recv(rfile)
+                _send(wfile, {'type': 'welcome'})
+                handler(rfile, wfile)
+
+        threading.Thread(target=serve, daemon=True).start()
+        return server.getsockname()
+
+    def _run(self, address, scan_func=_fake_scan):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return run_worker(f"{address[0]}:{address[1]}", scan_func, name='w', connect_timeout=5)
+
+    def test_eof_while_idle(self):
+        def handler(rfile, wfile):
+            _recv(rfile)
+            _send(wfile, {'type': 'wait', 'seconds': 0})
+            _recv(rfile)
+
+        self.assertEqual(self._run(self._serve_once(handler)), 0)
+
+    def test_eof_while_running_duplicate(self):
+        def handler(rfile, wfile):
+            _recv(rfile)
+            _send(wfile, {'type': 'shard', 'shard': 0, 'targets': ['10.0.3.1']})
+
+        self.assertEqual(self._run(self._serve_once(handler),
+                                   lambda target: _fake_scan(target, delay=0.2)), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
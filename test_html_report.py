@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTML报告格式测试: 紧凑格式与完整格式的大小比较
+
+运行: python -m unittest test_html_report
+
+Author: Security Researcher
+License: MIT
+"""
+
+import contextlib
+import gzip
+import io
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from html_report import ASSETS_DIR, HTMLReportGenerator
+from result_model import HostRecord, PortRecord
+
+
+def _sample_results(hosts=300, ports_per_host=10):
+    services = [('http', 'Apache httpd', '2.4.41'), ('ssh', 'OpenSSH', '8.2p1'),
+                ('https', 'nginx', '1.18.0'), ('mysql', 'MySQL', '5.7.33')]
+    results = {}
+    for h in range(hosts):
+        ip = f"10.0.{h >> 8 & 255}.{h & 255}"
+        results[ip] = HostRecord([f"host{h}.example"], None, [
+            PortRecord(p * 7 + h % 5, 'tcp', *services[p % len(services)],
+                       scripts=[{'id': 'banner', 'output': f'banner {h}-{p}'}] if p == 1 else None)
+            for p in range(1, ports_per_host + 1)])
+    return results
+
+
+class CompactReportSizeTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        now = datetime.now()
+        scan_info = {'start_time': now, 'end_time': now, 'total_scanned': 300, 'nmap_version': 'Nmap'}
+        results = _sample_results()
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.full_path = os.path.join(cls.tmp.name, 'full.html')
+        cls.compact_path = os.path.join(cls.tmp.name, 'compact.html')
+        with contextlib.redirect_stdout(io.StringIO()):
+            HTMLReportGenerator(results, scan_info).generate(cls.full_path)
+            HTMLReportGenerator(results, scan_info, compact=True).generate(cls.compact_path)
+        with open(cls.full_path, 'rb') as f:
+            cls.full_html = f.read()
+        with open(cls.compact_path, 'rb') as f:
+            cls.compact_html = f.read()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_compact_html_smaller_than_full(self):
+        self.assertLess(len(self.compact_html), len(self.full_html))
+
+    def test_compact_gzip_smaller_than_full(self):
+        compact_gz = os.path.getsize(self.compact_path + '.gz')
+        self.assertLess(compact_gz, len(self.full_html))
+        # 与完整格式同样gzip压缩后比较, 紧凑格式仍应更小
+        self.assertLess(compact_gz, len(gzip.compress(self.full_html, 9)))
+
+    def test_compact_gzip_matches_html(self):
+        with gzip.open(self.compact_path + '.gz', 'rb') as f:
+            self.assertEqual(f.read(), self.compact_html)
+
+    def test_compact_assets_written_once(self):
+        assets = os.listdir(os.path.join(self.tmp.name, ASSETS_DIR))
+        self.assertTrue(assets)
+        for name in assets:
+            link = f'{ASSETS_DIR}/{name}'.encode('utf-8')
+            self.assertTrue(link in self.compact_html, link)
+
+    def test_compact_keeps_host_details(self):
+        for marker in (b'10.0.1.43', b'host299.example', b'banner 7-1'):
+            self.assertTrue(marker in self.compact_html, marker)
+
+
+if __name__ == '__main__':
+    unittest.main()